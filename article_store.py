@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+from config import ARTICLE_STORE_PATH, ARTICLE_RETENTION_DAYS, ARTICLE_STORE_MAX_ROWS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    source TEXT,
+    created_at TEXT,
+    fetched_at REAL NOT NULL,
+    fetched_day INTEGER,
+    weirdness_score REAL NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_score ON articles (weirdness_score DESC);
+CREATE INDEX IF NOT EXISTS idx_articles_fetched ON articles (fetched_at);
+DROP INDEX IF EXISTS idx_articles_fetched_score;
+CREATE INDEX IF NOT EXISTS idx_articles_created ON articles (created_at);
+CREATE INDEX IF NOT EXISTS idx_articles_source ON articles (source, fetched_at);
+"""
+
+# A range on fetched_at can't also be read in score order, so the weirdest
+# article since X is found per day: each day is an equality match on this
+# index, giving its top row directly
+DAY_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_articles_day_score ON articles (fetched_day, weirdness_score DESC);
+"""
+
+def fetched_day(timestamp: float) -> int:
+    """UTC day number of a fetch time, the bucket top(since=...) reads."""
+    return int(timestamp // 86400)
+
+class ArticleStore:
+    def __init__(self, path: str = ARTICLE_STORE_PATH):
+        """Embedded SQLite store of scored articles, indexed by score, recency and source."""
+        self.path = os.path.expanduser(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        # auto_vacuum only takes effect before the first table exists
+        self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        # WAL lets the web app read while the scheduler worker writes
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        self.conn.executescript(DAY_INDEX)
+
+    def _migrate(self):
+        """Add and backfill fetched_day in stores created before it existed."""
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(articles)")}
+        if 'fetched_day' not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE articles ADD COLUMN fetched_day INTEGER")
+                self.conn.execute("UPDATE articles SET fetched_day = CAST(fetched_at / 86400 AS INTEGER)")
+
+    def upsert_articles(self, articles: List[Dict]) -> int:
+        """Insert or refresh articles by their stable ID; returns the number written."""
+        now = time.time()
+        rows = [(
+            article['id'],
+            article.get('title') or '',
+            article['url'],
+            article.get('source'),
+            article.get('created_at'),
+            now,
+            fetched_day(now),
+            article.get('weirdness_score', 0),
+            json.dumps(article)
+        ) for article in articles]
+
+        with self._lock, self.conn:
+            self.conn.executemany("""
+                INSERT INTO articles (id, title, url, source, created_at, fetched_at, fetched_day, weirdness_score, data)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    fetched_at = excluded.fetched_at,
+                    fetched_day = excluded.fetched_day,
+                    weirdness_score = excluded.weirdness_score,
+                    data = excluded.data
+            """, rows)
+        return len(rows)
+
+    def query(self, limit: int = 10, order_by: str = 'score', since: Optional[float] = None,
+              source: Optional[str] = None, min_score: Optional[float] = None) -> List[Dict]:
+        """Return articles ordered by 'score', 'fetched' or 'created', optionally filtered."""
+        order = {
+            'score': 'weirdness_score DESC',
+            'fetched': 'fetched_at DESC',
+            'created': 'created_at DESC'
+        }
+        if order_by not in order:
+            raise ValueError(f"Unsupported order: {order_by}")
+
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("fetched_at >= ?")
+            params.append(since)
+        if source is not None:
+            clauses.append("source = ?")
+            params.append(source)
+        if min_score is not None:
+            clauses.append("weirdness_score >= ?")
+            params.append(min_score)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT data FROM articles {where} ORDER BY {order[order_by]} LIMIT ?",
+                (*params, limit)
+            ).fetchall()
+        return [json.loads(row['data']) for row in rows]
+
+    def top(self, since: Optional[float] = None, source: Optional[str] = None) -> Optional[Dict]:
+        """Return the single weirdest article, or None if nothing matches."""
+        if since is None or source is not None:
+            articles = self.query(limit=1, since=since, source=source)
+            return articles[0] if articles else None
+
+        # One index seek per day in the window, instead of sorting every row in it
+        best = None
+        with self._lock:
+            for day in range(fetched_day(since), fetched_day(time.time()) + 1):
+                row = self.conn.execute(
+                    "SELECT data, weirdness_score FROM articles WHERE fetched_day = ? AND fetched_at >= ? "
+                    "ORDER BY weirdness_score DESC LIMIT 1",
+                    (day, since)
+                ).fetchone()
+                if row and (best is None or row['weirdness_score'] > best['weirdness_score']):
+                    best = row
+        return json.loads(best['data']) if best else None
+
+    def get(self, article_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self.conn.execute("SELECT data FROM articles WHERE id = ?", (article_id,)).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def prune(self, retention_days: float = ARTICLE_RETENTION_DAYS,
+              max_rows: int = ARTICLE_STORE_MAX_ROWS) -> int:
+        """Drop articles past retention or beyond max_rows (oldest first), then reclaim space."""
+        cutoff = time.time() - retention_days * 86400
+        with self._lock, self.conn:
+            removed = self.conn.execute("DELETE FROM articles WHERE fetched_at < ?", (cutoff,)).rowcount
+            removed += self.conn.execute("""
+                DELETE FROM articles WHERE id IN (
+                    SELECT id FROM articles ORDER BY fetched_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (max_rows,)).rowcount
+        if removed:
+            self.compact()
+        return removed
+
+    def compact(self):
+        """Return free pages to the filesystem and checkpoint the WAL."""
+        with self._lock:
+            self.conn.execute("PRAGMA incremental_vacuum")
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,67 @@
+import time
+import random
+from datetime import datetime, timedelta, timezone
+from news_scraper import WEIRD_KEYWORDS, local_weirdness_score, local_weirdness_scores
+
+FILLER_WORDS = ['man', 'florida', 'goat', 'council', 'arrested', 'town', 'mayor', 'cat',
+                'police', 'finds', 'giant', 'record', 'village', 'toilet', 'escaped', 'llama']
+
+def synthetic_articles(count: int, seed: int = 42):
+    """Build Reddit- and NewsAPI-shaped articles with a realistic keyword hit rate."""
+    rng = random.Random(seed)
+    now = datetime.now()
+    articles = []
+    for i in range(count):
+        words = rng.choices(FILLER_WORDS, k=rng.randint(5, 12))
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words)), rng.choice(WEIRD_KEYWORDS))
+        created = now - timedelta(hours=rng.uniform(0, 96))
+        if i % 2:
+            # Reddit: local naive timestamps and an engagement score
+            articles.append({
+                'title': ' '.join(words).capitalize(),
+                'created_at': created.isoformat(),
+                'score': rng.randint(0, 50000)
+            })
+        elif i % 10:
+            # NewsAPI: UTC 'Z' timestamps
+            utc = created.astimezone(timezone.utc).replace(tzinfo=None)
+            articles.append({
+                'title': ' '.join(words).title(),
+                'created_at': utc.isoformat(timespec='seconds') + 'Z'
+            })
+        else:
+            # Occasional explicit offsets and missing timestamps
+            offset = timezone(timedelta(hours=rng.choice([-5, 5.5, 9])))
+            articles.append({
+                'title': ' '.join(words),
+                'created_at': created.astimezone(offset).isoformat() if i % 20 else None
+            })
+    return articles
+
+def main(count: int = 100000):
+    """Compare the per-article heuristic with the batch version on synthetic titles."""
+    articles = synthetic_articles(count)
+    
+    start = time.perf_counter()
+    scalar = [local_weirdness_score(article) for article in articles]
+    scalar_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    batch = local_weirdness_scores(articles)
+    batch_time = time.perf_counter() - start
+    
+    columns = {key: [article.get(key) for article in articles] for key in ('title', 'score', 'created_at')}
+    start = time.perf_counter()
+    local_weirdness_scores(columns)
+    columnar_time = time.perf_counter() - start
+    
+    mismatches = sum(1 for a, b in zip(scalar, batch) if abs(a - b) > 1e-9)
+    print(f"{count} articles")
+    print(f"Per-article: {scalar_time:.3f}s ({count / scalar_time:,.0f} articles/s)")
+    print(f"Batch:       {batch_time:.3f}s ({count / batch_time:,.0f} articles/s, {scalar_time / batch_time:.1f}x)")
+    print(f"Columnar:    {columnar_time:.3f}s ({count / columnar_time:,.0f} articles/s)")
+    print(f"Mismatched scores: {mismatches}")
+
+if __name__ == "__main__":
+    main()
@@ -11,47 +11,128 @@ RATE_LIMIT_PERIOD = int(os.getenv('RATE_LIMIT_PERIOD', 60))
 MAX_PARALLEL_REQUESTS = int(os.getenv('MAX_PARALLEL_REQUESTS', 10))
 REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', 30))
 
-# LLM Configuration
+# News Ingestion Configuration
+SOURCE_TIMEOUT = float(os.getenv('SOURCE_TIMEOUT', 45))  # Total budget per source, retries included
+SOURCE_ATTEMPT_TIMEOUT = float(os.getenv('SOURCE_ATTEMPT_TIMEOUT', 20))
+SOURCE_MAX_RETRIES = int(os.getenv('SOURCE_MAX_RETRIES', 3))
+SOURCE_BACKOFF_BASE = float(os.getenv('SOURCE_BACKOFF_BASE', 1.0))
+SOURCE_BACKOFF_MAX = float(os.getenv('SOURCE_BACKOFF_MAX', 8.0))
+INGEST_STATE_PATH = os.getenv('INGEST_STATE_PATH', '~/weird_news_pipeline/ingest_state.json')
+SEEN_ITEMS_MAX = int(os.getenv('SEEN_ITEMS_MAX', 5000))  # Per-source seen-ID memory
+CURSOR_MAX_AGE = int(os.getenv('CURSOR_MAX_AGE', 86400))  # Drop listing cursors older than this (seconds)
+SIMHASH_MAX_DISTANCE = int(os.getenv('SIMHASH_MAX_DISTANCE', 6))  # Title bits that may differ between near-duplicates
+
+# Article Store Configuration
+ARTICLE_STORE_PATH = os.getenv('ARTICLE_STORE_PATH', '~/weird_news_pipeline/articles.db')
+ARTICLE_RETENTION_DAYS = float(os.getenv('ARTICLE_RETENTION_DAYS', 90))
+ARTICLE_STORE_MAX_ROWS = int(os.getenv('ARTICLE_STORE_MAX_ROWS', 500000))
+WEIRDEST_WINDOW_HOURS = float(os.getenv('WEIRDEST_WINDOW_HOURS', 24))  # How far back get_weirdest_article looks
+
+# Weirdness Score Cache Configuration
+SCORE_CACHE_PATH = os.getenv('SCORE_CACHE_PATH', '~/weird_news_pipeline/score_cache.db')
+SCORE_CACHE_TTL = float(os.getenv('SCORE_CACHE_TTL', 7 * 86400))
+SCORE_CACHE_MAX_ENTRIES = int(os.getenv('SCORE_CACHE_MAX_ENTRIES', 50000))
+GPT_SCORE_BATCH_SIZE = int(os.getenv('GPT_SCORE_BATCH_SIZE', 25))  # Articles rated per GPT request
+GPT_FALLBACK_CONCURRENCY = int(os.getenv('GPT_FALLBACK_CONCURRENCY', 4))  # Individual GPT scores in flight after a batch fails
+NLP_MAX_CONCURRENCY = int(os.getenv('NLP_MAX_CONCURRENCY', 8))  # Parallel Google NLP calls
+
+# Scoring Cascade Configuration
+CASCADE_TOP_K = int(os.getenv('CASCADE_TOP_K', 20))  # Local top-K sent to the expensive scorer
+CASCADE_EXPLORE = int(os.getenv('CASCADE_EXPLORE', 3))  # Random extra candidates from outside the top-K
+CASCADE_SHADOW_RATE = float(os.getenv('CASCADE_SHADOW_RATE', 0.05))  # Fraction of runs that fully score every article to audit the cascade
+
+# LLM Configuration (rate limits are per RATE_LIMIT_PERIOD, costs in USD)
 LLM_CONFIGS = {
     'gpt4': {
         'api_key': os.getenv('OPENAI_API_KEY'),
         'org_id': os.getenv('OPENAI_ORG_ID'),
         'max_tokens': int(os.getenv('OPENAI_MAX_TOKENS', 4096)),
         'temperature': float(os.getenv('OPENAI_TEMPERATURE', 0.7)),
-        'weight': float(os.getenv('MODEL_WEIGHTS_GPT4', 1.0))
+        'weight': float(os.getenv('MODEL_WEIGHTS_GPT4', 1.0)),
+        'rate_limit_requests': int(os.getenv('OPENAI_RATE_LIMIT_REQUESTS', RATE_LIMIT_REQUESTS)),
+        'rate_limit_tokens': int(os.getenv('OPENAI_RATE_LIMIT_TOKENS', 40000)),
+        'cost_per_1k_prompt': float(os.getenv('OPENAI_COST_PER_1K_PROMPT', 0.03)),
+        'cost_per_1k_completion': float(os.getenv('OPENAI_COST_PER_1K_COMPLETION', 0.06))
     },
     'claude': {
         'api_key': os.getenv('ANTHROPIC_API_KEY'),
         'max_tokens': int(os.getenv('ANTHROPIC_MAX_TOKENS', 4096)),
         'temperature': float(os.getenv('ANTHROPIC_TEMPERATURE', 0.7)),
-        'weight': float(os.getenv('MODEL_WEIGHTS_CLAUDE', 0.9))
+        'weight': float(os.getenv('MODEL_WEIGHTS_CLAUDE', 0.9)),
+        'rate_limit_requests': int(os.getenv('ANTHROPIC_RATE_LIMIT_REQUESTS', RATE_LIMIT_REQUESTS)),
+        'rate_limit_tokens': int(os.getenv('ANTHROPIC_RATE_LIMIT_TOKENS', 40000)),
+        'cost_per_1k_prompt': float(os.getenv('ANTHROPIC_COST_PER_1K_PROMPT', 0.008)),
+        'cost_per_1k_completion': float(os.getenv('ANTHROPIC_COST_PER_1K_COMPLETION', 0.024))
     },
     'mistral': {
         'api_key': os.getenv('MISTRAL_API_KEY'),
         'max_tokens': int(os.getenv('MISTRAL_MAX_TOKENS', 4096)),
         'temperature': float(os.getenv('MISTRAL_TEMPERATURE', 0.7)),
-        'weight': float(os.getenv('MODEL_WEIGHTS_MISTRAL', 0.8))
+        'weight': float(os.getenv('MODEL_WEIGHTS_MISTRAL', 0.8)),
+        'rate_limit_requests': int(os.getenv('MISTRAL_RATE_LIMIT_REQUESTS', RATE_LIMIT_REQUESTS)),
+        'rate_limit_tokens': int(os.getenv('MISTRAL_RATE_LIMIT_TOKENS', 100000)),
+        'cost_per_1k_prompt': float(os.getenv('MISTRAL_COST_PER_1K_PROMPT', 0.002)),
+        'cost_per_1k_completion': float(os.getenv('MISTRAL_COST_PER_1K_COMPLETION', 0.006))
     },
     'deepseek': {
         'api_key': os.getenv('DEEPSEEK_API_KEY'),
         'max_tokens': int(os.getenv('DEEPSEEK_MAX_TOKENS', 4096)),
         'temperature': float(os.getenv('DEEPSEEK_TEMPERATURE', 0.7)),
-        'weight': float(os.getenv('MODEL_WEIGHTS_DEEPSEEK', 0.8))
+        'weight': float(os.getenv('MODEL_WEIGHTS_DEEPSEEK', 0.8)),
+        'rate_limit_requests': int(os.getenv('DEEPSEEK_RATE_LIMIT_REQUESTS', RATE_LIMIT_REQUESTS)),
+        'rate_limit_tokens': int(os.getenv('DEEPSEEK_RATE_LIMIT_TOKENS', 100000)),
+        'cost_per_1k_prompt': float(os.getenv('DEEPSEEK_COST_PER_1K_PROMPT', 0.00014)),
+        'cost_per_1k_completion': float(os.getenv('DEEPSEEK_COST_PER_1K_COMPLETION', 0.00028))
     },
     'gemini': {
         'api_key': os.getenv('GOOGLE_API_KEY'),
         'max_tokens': int(os.getenv('GEMINI_MAX_TOKENS', 100000)),
         'temperature': float(os.getenv('GEMINI_TEMPERATURE', 0.7)),
-        'weight': float(os.getenv('MODEL_WEIGHTS_GEMINI', 0.9))
+        'weight': float(os.getenv('MODEL_WEIGHTS_GEMINI', 0.9)),
+        'rate_limit_requests': int(os.getenv('GEMINI_RATE_LIMIT_REQUESTS', RATE_LIMIT_REQUESTS)),
+        'rate_limit_tokens': int(os.getenv('GEMINI_RATE_LIMIT_TOKENS', 1000000)),
+        'cost_per_1k_prompt': float(os.getenv('GEMINI_COST_PER_1K_PROMPT', 0.00125)),
+        'cost_per_1k_completion': float(os.getenv('GEMINI_COST_PER_1K_COMPLETION', 0.005))
     },
     'perplexity': {
         'api_key': os.getenv('PERPLEXITY_API_KEY'),
         'max_tokens': int(os.getenv('PERPLEXITY_MAX_TOKENS', 4096)),
         'temperature': float(os.getenv('PERPLEXITY_TEMPERATURE', 0.7)),
-        'weight': float(os.getenv('MODEL_WEIGHTS_PERPLEXITY', 0.7))
+        'weight': float(os.getenv('MODEL_WEIGHTS_PERPLEXITY', 0.7)),
+        'rate_limit_requests': int(os.getenv('PERPLEXITY_RATE_LIMIT_REQUESTS', RATE_LIMIT_REQUESTS)),
+        'rate_limit_tokens': int(os.getenv('PERPLEXITY_RATE_LIMIT_TOKENS', 40000)),
+        'cost_per_1k_prompt': float(os.getenv('PERPLEXITY_COST_PER_1K_PROMPT', 0.001)),
+        'cost_per_1k_completion': float(os.getenv('PERPLEXITY_COST_PER_1K_COMPLETION', 0.001))
     }
 }
 
+# LLM Response Cache Configuration
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', '~/weird_news_pipeline/llm_cache.db')
+LLM_CACHE_TTL = float(os.getenv('LLM_CACHE_TTL', 7 * 86400))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 5000))
+
+# LLM Usage Metrics Configuration
+LLM_METRICS_LOG = os.getenv('LLM_METRICS_LOG', '~/weird_news_pipeline/llm_metrics.jsonl')  # One line per finished run
+
+# LLM Hedging Configuration
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', 0.9))  # Fire the next provider after this latency percentile
+HEDGE_MIN_SAMPLES = int(os.getenv('HEDGE_MIN_SAMPLES', 5))  # Observed calls needed before trusting the percentile
+HEDGE_DEFAULT_DELAY = float(os.getenv('HEDGE_DEFAULT_DELAY', 8.0))  # Seconds, until enough samples exist
+
+# LLM Routing Configuration
+ROUTING_EWMA_ALPHA = float(os.getenv('ROUTING_EWMA_ALPHA', 0.3))  # Weight of the newest latency/error sample
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 3))  # Consecutive failures that open a circuit
+CIRCUIT_RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', 60))  # Seconds before an open circuit allows a trial call
+ROUTING_LOG_SIZE = int(os.getenv('ROUTING_LOG_SIZE', 100))  # Recent routing decisions kept for inspection
+
+# LLM Client Configuration (provider calls time out after REQUEST_TIMEOUT)
+LLM_POOL_SIZE = int(os.getenv('LLM_POOL_SIZE', 20))  # Max open connections per provider
+LLM_KEEPALIVE_TIMEOUT = float(os.getenv('LLM_KEEPALIVE_TIMEOUT', 60))  # Seconds an idle connection stays open
+
+# Script Generation Configuration
+SCRIPT_MAX_CONCURRENCY = int(os.getenv('SCRIPT_MAX_CONCURRENCY', 4))  # Scripts generated at once by generate_scripts
+SCRIPT_STYLES = ["1940s newsreel", "comedic"]
+
 # Voice Generation Configuration
 VOICE_CONFIGS = {
     'elevenlabs': {
@@ -81,10 +162,31 @@ STOCK_FOOTAGE_CONFIGS = {
         'per_page': 15,
         'min_width': 1920,
         'min_duration': 3,
-        'max_duration': 30
+        'max_duration': 30,
+        # Renditions are chosen for the editor's output: smallest file at least this wide
+        'target_width': int(os.getenv('PEXELS_TARGET_WIDTH', 1920)),
+        'preferred_fps': float(os.getenv('PEXELS_PREFERRED_FPS', 30))
     }
 }
 
+PEXELS_SEARCH_CACHE_PATH = os.getenv('PEXELS_SEARCH_CACHE_PATH', '~/weird_news_pipeline/pexels_search_cache.db')
+PEXELS_SEARCH_TTL = float(os.getenv('PEXELS_SEARCH_TTL', 6 * 3600))  # Seconds a search result is fresh
+PEXELS_SEARCH_STALE_TTL = float(os.getenv('PEXELS_SEARCH_STALE_TTL', 7 * 86400))  # Seconds after that it is served while refreshing
+PEXELS_SEARCH_CACHE_MAX_ENTRIES = int(os.getenv('PEXELS_SEARCH_CACHE_MAX_ENTRIES', 5000))
+FOOTAGE_CACHE_DIR = os.getenv('FOOTAGE_CACHE_DIR', '~/weird_news_pipeline/stock_footage/cache')
+FOOTAGE_CACHE_MAX_BYTES = int(os.getenv('FOOTAGE_CACHE_MAX_BYTES', 5 * 1024 ** 3))  # Least-recently-used clips evicted past this
+FOOTAGE_CACHE_EVICT_GRACE = float(os.getenv('FOOTAGE_CACHE_EVICT_GRACE', 900))  # Clips used this recently (seconds) are never evicted
+FOOTAGE_DOWNLOAD_CONCURRENCY = int(os.getenv('FOOTAGE_DOWNLOAD_CONCURRENCY', 2))  # Clip downloads in flight at once
+FOOTAGE_DEADLINE = float(os.getenv('FOOTAGE_DEADLINE', 120))  # Seconds for all sections' footage before falling back to cached clips
+
+# Media Download Configuration (stalled connections time out after REQUEST_TIMEOUT)
+DOWNLOAD_CHUNK_SIZE = int(os.getenv('DOWNLOAD_CHUNK_SIZE', 1024 * 1024))  # Bytes per read and per off-loop write
+DOWNLOAD_PARTS = int(os.getenv('DOWNLOAD_PARTS', 4))  # Parallel byte ranges for a large file
+DOWNLOAD_PARALLEL_MIN_SIZE = int(os.getenv('DOWNLOAD_PARALLEL_MIN_SIZE', 16 * 1024 * 1024))  # Smaller files use one range
+DOWNLOAD_MAX_RETRIES = int(os.getenv('DOWNLOAD_MAX_RETRIES', 3))  # Per range; each retry resumes where it stopped
+DOWNLOAD_BACKOFF_BASE = float(os.getenv('DOWNLOAD_BACKOFF_BASE', 1.0))
+DOWNLOAD_WRITE_WORKERS = int(os.getenv('DOWNLOAD_WRITE_WORKERS', 4))
+
 # Image Generation Configuration
 IMAGE_CONFIGS = {
     'stability': {
@@ -0,0 +1,139 @@
+import re
+import asyncio
+import hashlib
+import aiohttp
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from config import REQUEST_TIMEOUT, SIMHASH_MAX_DISTANCE
+
+# Query parameters that only identify the referrer/campaign, never the story
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'igshid', 'mc_cid', 'mc_eid',
+    'ref', 'ref_src', 'ref_url', 'referrer', 'cmpid', 'ocid', 'smid', 'src', 'share'
+}
+TRACKING_PREFIXES = ('utm_', '_hs', 'pk_', 'at_')
+
+# Redirect-only hosts worth one HEAD request to find the real article URL
+SHORTENER_HOSTS = {
+    'bit.ly', 't.co', 'tinyurl.com', 'ow.ly', 'buff.ly', 'goo.gl',
+    'dlvr.it', 'trib.al', 'apne.ws', 'reut.rs', 'nyti.ms', 'wapo.st', 'bbc.in'
+}
+
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+# NewsAPI titles often end in " - Publisher"; syndicated copies differ only there
+PUBLISHER_SUFFIX_RE = re.compile(r"\s+[-|\u2013\u2014]\s+[^-|\u2013\u2014]{1,40}$")
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 8  # Pigeonhole: any pair within 7 bits shares at least one 8-bit band
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL so copies of the same story compare equal."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if host.endswith(':80') or host.endswith(':443'):
+        host = host.rsplit(':', 1)[0]
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('https', host, path, urlencode(query), ''))
+
+def content_id(url: str) -> str:
+    """Stable, process-independent ID for a story, usable as a cache key."""
+    return hashlib.sha1(canonicalize_url(url).encode('utf-8')).hexdigest()[:16]
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over the words of a title."""
+    tokens = TOKEN_RE.findall(PUBLISHER_SUFFIX_RE.sub('', text).lower())
+    if not tokens:
+        return 0
+
+    weights = [0] * SIMHASH_BITS
+    for feature in tokens:
+        digest = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if digest >> bit & 1 else -1
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+class Deduplicator:
+    def __init__(self, max_distance: int = SIMHASH_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.resolved_urls: Dict[str, str] = {}
+
+    async def resolve_url(self, session: aiohttp.ClientSession, url: str) -> str:
+        """Follow a known shortener to its destination; other URLs pass through."""
+        if urlsplit(url).netloc.lower() not in SHORTENER_HOSTS:
+            return url
+        if url not in self.resolved_urls:
+            try:
+                async with session.head(url, allow_redirects=True) as response:
+                    self.resolved_urls[url] = str(response.url)
+            except Exception as e:
+                print(f"Error resolving short URL {url}: {str(e)}")
+                return url
+        return self.resolved_urls[url]
+
+    def _merge(self, keep: Dict, duplicate: Dict):
+        """Fold a duplicate into the kept article, preferring the richer copy's fields."""
+        if not keep.get('description') and duplicate.get('description'):
+            keep['description'] = duplicate['description']
+        if duplicate.get('score', 0) > keep.get('score', 0):
+            keep['score'] = duplicate['score']
+        sources = keep.setdefault('duplicate_sources', [])
+        source = duplicate.get('source')
+        if source and source != keep.get('source') and source not in sources:
+            sources.append(source)
+
+    async def dedupe(self, articles: List[Dict], session: Optional[aiohttp.ClientSession] = None) -> List[Dict]:
+        """Assign stable IDs and collapse exact-URL and near-duplicate-title copies."""
+        if session is None:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)) as session:
+                return await self.dedupe(articles, session)
+
+        urls = await asyncio.gather(*(self.resolve_url(session, article['url']) for article in articles))
+
+        by_id: Dict[str, Dict] = {}
+        for article, url in zip(articles, urls):
+            article['canonical_url'] = canonicalize_url(url)
+            article['id'] = content_id(url)
+            if article['id'] in by_id:
+                self._merge(by_id[article['id']], article)
+            else:
+                by_id[article['id']] = article
+
+        # Bucket SimHashes by band so only plausible pairs get a Hamming check
+        band_bits = SIMHASH_BITS // SIMHASH_BANDS
+        band_mask = (1 << band_bits) - 1
+        buckets: Dict[tuple, List[tuple]] = {}
+        unique = []
+        for article in by_id.values():
+            fingerprint = simhash(article.get('title') or '')
+            keys = [(band, fingerprint >> (band * band_bits) & band_mask) for band in range(SIMHASH_BANDS)]
+
+            match = None
+            if fingerprint:
+                for key in keys:
+                    for candidate_fingerprint, candidate in buckets.get(key, []):
+                        if hamming_distance(fingerprint, candidate_fingerprint) <= self.max_distance:
+                            match = candidate
+                            break
+                    if match:
+                        break
+
+            if match:
+                self._merge(match, article)
+                continue
+
+            for key in keys:
+                buckets.setdefault(key, []).append((fingerprint, article))
+            unique.append(article)
+
+        if len(unique) < len(articles):
+            print(f"Deduplicated {len(articles)} articles down to {len(unique)}")
+        return unique
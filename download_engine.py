@@ -0,0 +1,360 @@
+import os
+import re
+import json
+import math
+import fcntl
+import weakref
+import threading
+import random
+import asyncio
+import hashlib
+import tempfile
+import aiohttp
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from config import (
+    REQUEST_TIMEOUT, DOWNLOAD_CHUNK_SIZE, DOWNLOAD_PARTS, DOWNLOAD_PARALLEL_MIN_SIZE,
+    DOWNLOAD_MAX_RETRIES, DOWNLOAD_BACKOFF_BASE, DOWNLOAD_WRITE_WORKERS
+)
+from single_flight import SingleFlight
+
+# S3-style CDNs use the body's MD5 as the ETag of single-part uploads
+MD5_ETAG_RE = re.compile(r'^"?([0-9a-fA-F]{32})"?$')
+# Persist range progress every this many chunks, so a crash loses little
+STATE_SAVE_EVERY = 8
+# Seconds between attempts to take a destination's lock held by another process
+LOCK_POLL_INTERVAL = 0.5
+
+class RetryableDownloadError(Exception):
+    """A transient failure: the connection dropped early or the server had a 5xx."""
+
+class DownloadEngine:
+    def __init__(self, chunk_size: int = DOWNLOAD_CHUNK_SIZE, parts: int = DOWNLOAD_PARTS,
+                 parallel_min_size: int = DOWNLOAD_PARALLEL_MIN_SIZE, max_retries: int = DOWNLOAD_MAX_RETRIES):
+        """Resumable HTTP downloads with large reads, off-loop writes and parallel byte ranges."""
+        self.chunk_size = chunk_size
+        self.parts = parts
+        self.parallel_min_size = parallel_min_size
+        self.max_retries = max_retries
+        # File writes and hashing block, so they run here instead of on the event loop
+        self.io_executor = ThreadPoolExecutor(max_workers=DOWNLOAD_WRITE_WORKERS, thread_name_prefix='download-io')
+        self._session = None
+        self._session_loop: Optional[weakref.ref] = None  # Weak, so a finished loop can be collected
+        # Downloads in progress by destination, so concurrent callers share one transfer
+        self.in_flight = SingleFlight()
+
+    def session(self) -> aiohttp.ClientSession:
+        """One keep-alive session per event loop, shared by every download."""
+        loop = asyncio.get_running_loop()
+        old_loop = self._session_loop() if self._session_loop else None
+        if self._session is None or self._session.closed or old_loop is not loop:
+            if self._session is not None and not self._session.closed:
+                if old_loop is not None and old_loop.is_running():
+                    old_loop.call_soon_threadsafe(old_loop.create_task, self._session.close())
+                else:
+                    print("Dropping a download session whose event loop is no longer running")
+            self._session = aiohttp.ClientSession(
+                # No total timeout for large files; a stalled read or connect still fails
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=REQUEST_TIMEOUT, sock_read=REQUEST_TIMEOUT),
+                read_bufsize=self.chunk_size
+            )
+            self._session_loop = weakref.ref(loop)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def discard(self):
+        """Release what can be released without an event loop, once this engine's loop has closed."""
+        if self._session is not None and not self._session.closed:
+            print("Dropping a download session whose event loop closed before close()")
+        self._session = None
+        self.io_executor.shutdown(wait=False)
+
+    async def _io(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.io_executor, func, *args)
+
+    async def probe(self, url: str, headers: Optional[Dict] = None) -> Dict:
+        """Size, ETag and range support of a URL from a HEAD request; empty if unavailable."""
+        try:
+            async with self.session().head(url, headers=headers, allow_redirects=True) as response:
+                if response.status != 200:
+                    return {}
+                length = response.headers.get('Content-Length')
+                return {
+                    'size': int(length) if length else None,
+                    'etag': response.headers.get('ETag'),
+                    'ranges': response.headers.get('Accept-Ranges', '').lower() == 'bytes'
+                }
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"HEAD {url} failed, downloading without ranges: {str(e)}")
+            return {}
+
+    async def download(self, url: str, filepath: str, headers: Optional[Dict] = None,
+                       sha256: Optional[str] = None, expected_size: Optional[int] = None,
+                       ready: Optional[Callable[[], Optional[str]]] = None,
+                       finalize: Optional[Callable[[str], str]] = None) -> str:
+        """Download url to filepath and return filepath.
+        
+        Progress is kept in "<filepath>.part" (plus a ".part.json" range map),
+        so a later call for the same filepath resumes a failed download. The
+        file only appears at filepath once its length, and its checksum when
+        one is known (sha256, or an MD5 ETag), verify.
+        
+        Concurrent calls for one filepath share a single transfer, and an
+        exclusive "<filepath>.lock" keeps other processes off the same part
+        file. Under that lock, `ready` may return an existing result to skip
+        the download, and `finalize` may move the finished file elsewhere;
+        its return value is then the result.
+        """
+        # The transfer is only abandoned once nobody is waiting for it
+        return await self.in_flight.run(filepath, lambda: self._download_locked(
+            url, filepath, headers, sha256, expected_size, ready, finalize
+        ))
+
+    async def _lock(self, lock_path: str) -> int:
+        """Take an exclusive flock on lock_path without blocking the event loop.
+        
+        The holder unlinks the file before releasing it, so a lock taken on a
+        file that is no longer at lock_path is dropped and retried.
+        """
+        while True:
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                while True:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        await asyncio.sleep(LOCK_POLL_INTERVAL)
+                try:
+                    current = os.stat(lock_path)
+                except FileNotFoundError:
+                    current = None
+                if current is not None and current.st_ino == os.fstat(fd).st_ino:
+                    return fd
+            except BaseException:
+                os.close(fd)
+                raise
+            os.close(fd)
+
+    @staticmethod
+    def _unlock(fd: int, lock_path: str):
+        # Removed while still held, so no lock files pile up next to finished downloads
+        try:
+            os.unlink(lock_path)
+        except FileNotFoundError:
+            pass
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    async def _download_locked(self, url: str, filepath: str, headers: Optional[Dict], sha256: Optional[str],
+                               expected_size: Optional[int], ready: Optional[Callable[[], Optional[str]]],
+                               finalize: Optional[Callable[[str], str]]) -> str:
+        os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+        lock_path = f"{filepath}.lock"
+        lock_fd = await self._lock(lock_path)
+        try:
+            # Another process may have finished this file while we waited for the lock
+            existing = ready() if ready else None
+            if existing:
+                return existing
+            await self._download(url, filepath, headers, sha256, expected_size)
+            return finalize(filepath) if finalize else filepath
+        finally:
+            self._unlock(lock_fd, lock_path)
+
+    async def _download(self, url: str, filepath: str, headers: Optional[Dict],
+                        sha256: Optional[str], expected_size: Optional[int]):
+        part_path, state_path = f"{filepath}.part", f"{filepath}.part.json"
+
+        info = await self.probe(url, headers)
+        size = info.get('size') or expected_size
+        if size and info.get('ranges'):
+            await self._download_ranges(url, headers, part_path, state_path, size, info.get('etag'))
+        else:
+            size = await self._download_stream(url, headers, part_path) or expected_size
+
+        try:
+            await self._io(self._verify, part_path, size, sha256, info.get('etag'))
+        except Exception:
+            # A corrupt file must not be resumed either
+            for path in (part_path, state_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+        os.replace(part_path, filepath)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+
+    def _split(self, size: int) -> List[List[int]]:
+        """[start, next byte to fetch, end] ranges (inclusive end) covering the file."""
+        count = self.parts if size >= self.parallel_min_size else 1
+        step = math.ceil(size / count)
+        return [[start, start, min(start + step, size) - 1] for start in range(0, size, step)]
+
+    def _load_ranges(self, state_path: str, part_path: str, url: str, size: int, etag: Optional[str]):
+        """Range progress of an earlier attempt at the same file, or None to start over."""
+        try:
+            with open(state_path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Without an ETag, only trust progress for the very same URL
+        same_file = state.get('size') == size and (state.get('etag') == etag if etag else state.get('url') == url)
+        if not same_file or not os.path.exists(part_path) or os.path.getsize(part_path) != size:
+            return None
+        return state['ranges']
+
+    @staticmethod
+    def _allocate(part_path: str, size: int):
+        with open(part_path, 'wb') as f:
+            f.truncate(size)
+
+    @staticmethod
+    def _save_state(state_path: str, state: Dict):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(state_path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, state_path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    async def _download_ranges(self, url: str, headers: Optional[Dict], part_path: str, state_path: str,
+                               size: int, etag: Optional[str]):
+        ranges = self._load_ranges(state_path, part_path, url, size, etag)
+        if ranges is None:
+            ranges = self._split(size)
+            await self._io(self._allocate, part_path, size)
+        else:
+            done = sum(position - start for start, position, _ in ranges)
+            print(f"Resuming {url} at {done}/{size} bytes")
+        state = {'url': url, 'size': size, 'etag': etag, 'ranges': ranges}
+
+        fd = await self._io(os.open, part_path, os.O_WRONLY)
+        tasks = [asyncio.ensure_future(self._fetch_range(url, headers, fd, byte_range, state, state_path))
+                 for byte_range in ranges if byte_range[1] <= byte_range[2]]
+        try:
+            if tasks:
+                await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Record how far each range got so the next attempt resumes from there
+            await self._io(self._save_state, state_path, state)
+            raise
+        finally:
+            await self._io(os.close, fd)
+
+    async def _fetch_range(self, url: str, headers: Optional[Dict], fd: int, byte_range: List[int],
+                           state: Dict, state_path: str):
+        """Fetch one byte range into its place in the part file, resuming on transient errors."""
+        attempt = 0
+        while byte_range[1] <= byte_range[2]:
+            request_headers = {**(headers or {}), 'Range': f"bytes={byte_range[1]}-{byte_range[2]}"}
+            try:
+                async with self.session().get(url, headers=request_headers) as response:
+                    if response.status >= 500:
+                        raise RetryableDownloadError(f"Server error {response.status}")
+                    if response.status != 206:
+                        raise Exception(f"Failed to download {url}: range request returned {response.status}")
+                    chunks = 0
+                    async for chunk in response.content.iter_chunked(self.chunk_size):
+                        chunk = chunk[:byte_range[2] + 1 - byte_range[1]]
+                        await self._io(os.pwrite, fd, chunk, byte_range[1])
+                        byte_range[1] += len(chunk)
+                        chunks += 1
+                        if chunks % STATE_SAVE_EVERY == 0:
+                            await self._io(self._save_state, state_path, state)
+                if byte_range[1] <= byte_range[2]:
+                    raise RetryableDownloadError("Connection closed before the range was complete")
+            except (aiohttp.ClientError, asyncio.TimeoutError, RetryableDownloadError) as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                backoff = random.uniform(0, DOWNLOAD_BACKOFF_BASE * 2 ** attempt)
+                print(f"Retrying {url} from byte {byte_range[1]} in {backoff:.1f}s: {str(e)}")
+                await asyncio.sleep(backoff)
+
+    async def _download_stream(self, url: str, headers: Optional[Dict], part_path: str) -> Optional[int]:
+        """Sequential download for servers without HEAD/range support; returns the expected
+        size if the server declared one. A retry asks for the rest with a Range header."""
+        attempt = 0
+        while True:
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            request_headers = dict(headers or {})
+            if offset:
+                request_headers['Range'] = f"bytes={offset}-"
+            try:
+                async with self.session().get(url, headers=request_headers) as response:
+                    if response.status >= 500:
+                        raise RetryableDownloadError(f"Server error {response.status}")
+                    if response.status == 200:
+                        offset = 0  # The server ignored the range; start over
+                    elif response.status == 416:
+                        # Leftover from a ranged attempt at a file that has since changed
+                        os.remove(part_path)
+                        raise RetryableDownloadError("Partial file doesn't match the server's copy")
+                    elif response.status != 206:
+                        raise Exception(f"Failed to download {url}: {response.status}")
+                    expected = offset + response.content_length if response.content_length is not None else None
+
+                    f = await self._io(open, part_path, 'ab' if offset else 'wb')
+                    try:
+                        async for chunk in response.content.iter_chunked(self.chunk_size):
+                            await self._io(f.write, chunk)
+                            offset += len(chunk)
+                    finally:
+                        await self._io(f.close)
+                if expected is not None and offset < expected:
+                    raise RetryableDownloadError("Connection closed before the file was complete")
+                return expected
+            except (aiohttp.ClientError, asyncio.TimeoutError, RetryableDownloadError) as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                backoff = random.uniform(0, DOWNLOAD_BACKOFF_BASE * 2 ** attempt)
+                print(f"Retrying {url} from byte {offset} in {backoff:.1f}s: {str(e)}")
+                await asyncio.sleep(backoff)
+
+    def _verify(self, part_path: str, size: Optional[int], sha256: Optional[str], etag: Optional[str]):
+        """Check the finished file's length and, where an expected digest is known, its checksum."""
+        actual_size = os.path.getsize(part_path)
+        if size is not None and actual_size != size:
+            raise Exception(f"Downloaded {actual_size} bytes, expected {size}")
+
+        md5_match = MD5_ETAG_RE.match(etag or '')
+        if sha256:
+            digest, expected = hashlib.sha256(), sha256.lower()
+        elif md5_match:
+            digest, expected = hashlib.md5(), md5_match.group(1).lower()
+        else:
+            return
+        with open(part_path, 'rb') as f:
+            for block in iter(lambda: f.read(self.chunk_size), b''):
+                digest.update(block)
+        if digest.hexdigest() != expected:
+            raise Exception(f"Checksum mismatch for {part_path}: {digest.hexdigest()} != {expected}")
+
+# One engine per event loop, like shared_llm_manager: sessions and in-flight transfers are
+# loop-bound, and entries for closed loops are evicted explicitly
+_shared_engines: Dict[asyncio.AbstractEventLoop, DownloadEngine] = {}
+_shared_lock = threading.Lock()
+
+def shared_download_engine() -> DownloadEngine:
+    """The DownloadEngine for the running event loop, so its media downloads share connections and I/O threads."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = asyncio.get_event_loop()
+    with _shared_lock:
+        for closed in [other for other in _shared_engines if other.is_closed()]:
+            _shared_engines.pop(closed).discard()
+        if loop not in _shared_engines:
+            _shared_engines[loop] = DownloadEngine()
+        return _shared_engines[loop]
@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import fcntl
+import sqlite3
+import threading
+from typing import Dict, Optional
+from config import FOOTAGE_CACHE_DIR, FOOTAGE_CACHE_MAX_BYTES, FOOTAGE_CACHE_EVICT_GRACE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clips (
+    key TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    meta TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_clips_accessed ON clips (accessed_at);
+"""
+
+# Seconds after which an unfinished download is assumed abandoned
+STALE_PART_AGE = 3600
+
+class FootageCache:
+    def __init__(self, directory: str = FOOTAGE_CACHE_DIR, max_bytes: int = FOOTAGE_CACHE_MAX_BYTES,
+                 evict_grace: float = FOOTAGE_CACHE_EVICT_GRACE):
+        """Downloaded clips keyed by video ID and rendition, evicted least-recently-used past max_bytes.
+        
+        Pinned clips, and clips used within evict_grace seconds (which covers
+        other processes sharing the directory), are never evicted.
+        """
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.evict_grace = evict_grace
+        self.pins: Dict[str, int] = {}  # Filename -> number of holders in this process
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(self.directory, "index.db"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        self._reconcile()
+
+    @staticmethod
+    def key(video_id, rendition) -> str:
+        return f"{video_id}-{rendition}"
+
+    def path_for(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    def temp_path(self, key: str) -> str:
+        """Where to download a clip before put() moves it into place; stable per key,
+        so an interrupted download can be resumed."""
+        return self.path_for(f".{key}.download")
+
+    def _reconcile(self):
+        """Drop index rows whose file is gone and stale leftovers of interrupted downloads."""
+        with self._lock, self.conn:
+            rows = self.conn.execute("SELECT key, filename FROM clips").fetchall()
+            missing = [(key,) for key, filename in rows if not os.path.exists(self.path_for(filename))]
+            self.conn.executemany("DELETE FROM clips WHERE key = ?", missing)
+        # The web app and the worker share the cache, so only clear parts nobody is still writing
+        cutoff = time.time() - STALE_PART_AGE
+        for filename in os.listdir(self.directory):
+            path = self.path_for(filename)
+            try:
+                if filename.endswith('.lock'):
+                    self._remove_stale_lock(path)
+                elif filename.endswith(('.part', '.part.json', '.download')) and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _remove_stale_lock(path: str):
+        """Remove a download lock left by a crashed process; one that is held is left alone."""
+        fd = os.open(path, os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return
+        try:
+            os.unlink(path)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached clip's path, or None on a miss."""
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT filename FROM clips WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            path = self.path_for(row[0])
+            if not os.path.exists(path):
+                self.conn.execute("DELETE FROM clips WHERE key = ?", (key,))
+                return None
+            self.conn.execute("UPDATE clips SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return path
+
+    def pin(self, path: str):
+        """Keep a clip from eviction until a matching unpin(); pins are counted."""
+        filename = os.path.basename(path)
+        with self._lock:
+            self.pins[filename] = self.pins.get(filename, 0) + 1
+
+    def unpin(self, path: str):
+        filename = os.path.basename(path)
+        with self._lock:
+            count = self.pins.get(filename, 0) - 1
+            if count > 0:
+                self.pins[filename] = count
+            else:
+                self.pins.pop(filename, None)
+
+    def meta(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self.conn.execute("SELECT meta FROM clips WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, temp_path: str, meta: Optional[Dict] = None, extension: str = '.mp4') -> str:
+        """Atomically move a finished download into the cache and evict down to the budget."""
+        filename = f"{key}{extension}"
+        path = self.path_for(filename)
+        os.replace(temp_path, path)
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO clips (key, filename, size, created_at, accessed_at, meta) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, filename, os.path.getsize(path), now, now, json.dumps(meta or {}))
+            )
+            self._evict(keep=key)
+        return path
+
+    def _evict(self, keep: str):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM clips").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Recently used clips may have been handed out and not yet read, here or in another process
+        rows = self.conn.execute(
+            "SELECT key, filename, size FROM clips WHERE key != ? AND accessed_at < ? ORDER BY accessed_at",
+            (keep, time.time() - self.evict_grace)
+        ).fetchall()
+        for key, filename, size in rows:
+            if total <= self.max_bytes:
+                break
+            if filename in self.pins:
+                continue
+            try:
+                os.remove(self.path_for(filename))
+            except FileNotFoundError:
+                pass
+            self.conn.execute("DELETE FROM clips WHERE key = ?", (key,))
+            total -= size
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM clips").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
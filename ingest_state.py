@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import fcntl
+import tempfile
+from typing import Any, Callable, Dict, Iterable, List
+from config import INGEST_STATE_PATH, SEEN_ITEMS_MAX
+
+class IngestState:
+    def __init__(self, path: str = INGEST_STATE_PATH, max_seen: int = SEEN_ITEMS_MAX):
+        """Persisted per-source cursors, HTTP validators and seen-item IDs."""
+        self.path = os.path.expanduser(path)
+        self.max_seen = max_seen
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.sources = self._load()
+        self.dirty = set()
+
+    def _load(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f).get('sources', {})
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable ingest state {self.path}: {str(e)}")
+            return {}
+
+    def _source(self, source: str) -> Dict:
+        state = self.sources.setdefault(source, {'cursors': {}, 'seen': []})
+        state.setdefault('cursor_times', {})  # Cursor key -> when this process last set it
+        return state
+
+    def get_cursor(self, source: str, key: str, default: Any = None) -> Any:
+        """Return a stored cursor (high-water mark, ETag, since_id, ...) for a source."""
+        return self._source(source)['cursors'].get(key, default)
+
+    def set_cursor(self, source: str, key: str, value: Any):
+        state = self._source(source)
+        if value is None:
+            state['cursors'].pop(key, None)
+        else:
+            state['cursors'][key] = value
+        state['cursor_times'][key] = time.time()
+        self.dirty.add(source)
+
+    def conditional_headers(self, source: str, url: str) -> Dict[str, str]:
+        """Build If-None-Match/If-Modified-Since headers from the last response for a URL."""
+        validators = self.get_cursor(source, f"validators:{url}", {})
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    def remember_validators(self, source: str, url: str, response_headers):
+        """Store the ETag/Last-Modified of a 200 response for the next conditional GET."""
+        validators = {
+            'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified')
+        }
+        if any(validators.values()):
+            self.set_cursor(source, f"validators:{url}", validators)
+
+    def unseen(self, source: str, items: Iterable[Dict], key: Callable[[Dict], Any] = lambda item: item['id']) -> List[Dict]:
+        """Return only the items whose key has not been marked seen for this source."""
+        seen = set(self._source(source)['seen'])
+        fresh = []
+        for item in items:
+            item_key = str(key(item))
+            if item_key not in seen:
+                seen.add(item_key)
+                fresh.append(item)
+        return fresh
+
+    def mark_seen(self, source: str, keys: Iterable[Any]):
+        """Record handled item keys, keeping only the most recent max_seen per source."""
+        state = self._source(source)
+        known = set(state['seen'])
+        for item_key in map(str, keys):
+            if item_key not in known:
+                known.add(item_key)
+                state['seen'].append(item_key)
+        del state['seen'][:-self.max_seen]
+        self.dirty.add(source)
+
+    def _merge_source(self, stored: Dict, ours: Dict) -> Dict:
+        """Combine another writer's state for a source with ours: seen IDs are
+        unioned, and each cursor keeps whichever side set it last."""
+        stored_times = stored.get('cursor_times', {})
+        cursors = dict(stored.get('cursors', {}))
+        times = dict(stored_times)
+        for key, set_at in ours['cursor_times'].items():
+            if set_at >= stored_times.get(key, 0):
+                times[key] = set_at
+                if key in ours['cursors']:
+                    cursors[key] = ours['cursors'][key]
+                else:
+                    cursors.pop(key, None)
+
+        seen = list(stored.get('seen', []))
+        known = set(seen)
+        seen.extend(item_key for item_key in ours['seen'] if item_key not in known)
+        return {'cursors': cursors, 'cursor_times': times, 'seen': seen[-self.max_seen:]}
+
+    def save(self):
+        """Atomically write back the sources changed in this process.
+
+        Several writers share sources (the web app, the scheduler worker and
+        concurrent runs each hold an IngestState), so under a file lock the
+        file is re-read and each changed source merged into it rather than
+        replaced.
+        """
+        if not self.dirty:
+            return
+        with open(f"{self.path}.lock", 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            merged = self._load()
+            for source in self.dirty:
+                merged[source] = self._merge_source(merged.get(source, {}), self._source(source))
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump({'updated_at': time.time(), 'sources': merged}, f)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+        self.sources = merged
+        self.dirty.clear()
@@ -1,34 +1,183 @@
 import time
 import random
 import asyncio
+import weakref
+import threading
 import aiohttp
-from typing import Dict, List, Optional
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional
 import openai
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 import google.generativeai as genai
-from config import LLM_CONFIGS, RATE_LIMIT_REQUESTS, RATE_LIMIT_PERIOD
+from config import (
+    LLM_CONFIGS, RATE_LIMIT_REQUESTS, RATE_LIMIT_PERIOD, REQUEST_TIMEOUT,
+    LLM_POOL_SIZE, LLM_KEEPALIVE_TIMEOUT,
+    LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_ENTRIES,
+    HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES, HEDGE_DEFAULT_DELAY, ROUTING_LOG_SIZE
+)
+from rate_limiter import SlidingWindowLimiter
+from provider_health import ProviderHealth
+from llm_metrics import LLMMetrics, current_stage
+from disk_cache import DiskCache, content_key
+from single_flight import SingleFlight
 
 class LLMManager:
-    def __init__(self):
+    def __init__(self, metrics: Optional[LLMMetrics] = None):
         self.llm_configs = LLM_CONFIGS
         self.rate_limit = RATE_LIMIT_REQUESTS
         self.rate_period = RATE_LIMIT_PERIOD
-        self.request_times = []
+        # Separate request and token budgets per provider, so a burst on one never starves another
+        self.limiters = {
+            model: SlidingWindowLimiter(
+                config.get('rate_limit_requests', self.rate_limit),
+                config.get('rate_limit_tokens'),
+                self.rate_period
+            )
+            for model, config in self.llm_configs.items()
+        }
+        self.providers = {
+            'gpt4': self.call_openai,
+            'claude': self.call_anthropic,
+            'gemini': self.call_google
+        }
+        # Providers that can return their answer incrementally
+        self.streaming_providers = {
+            'gpt4': self.stream_openai
+        }
+        # Long-lived provider clients, created on first use and kept until close()
+        self.client_factories = {
+            'gpt4': self.create_openai_client,
+            'claude': self.create_anthropic_client,
+            'gemini': self.create_google_client
+        }
+        self.clients = {}
+        self._clients_loop: Optional[weakref.ref] = None  # Weak, so a finished loop can be collected
+        # Content-addressed responses, so re-runs and static prompts skip the API
+        self.cache = DiskCache(LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES, ttl=LLM_CACHE_TTL)
+        # Identical requests currently on the wire, keyed like the cache
+        self.in_flight = SingleFlight()
+        # Recent call latencies (seconds) by (provider, stage), used to time hedged requests;
+        # per stage so short scoring calls don't set the hedge delay for long script calls
+        self.latencies: Dict[tuple, deque] = {}
+        # Latency/error EWMAs and circuit breakers that drive provider_order()
+        self.health = {model: ProviderHealth() for model in self.providers}
+        self.routing_log = deque(maxlen=ROUTING_LOG_SIZE)
+        # Tokens, cost, latency and cache outcome of every call, by provider and stage
+        self.metrics = metrics or LLMMetrics()
+
+    @staticmethod
+    def count_tokens(text: str) -> int:
+        """Approximate token count (~4 chars/token); the providers' tokenizers aren't available here."""
+        return len(text) // 4
+
+    def estimate_tokens(self, prompt: str, model: str) -> int:
+        """Tokens to reserve for a call: the prompt plus the completion cap,
+        which is how providers count a request against their token limits."""
+        return self.count_tokens(prompt) + self.llm_configs[model]['max_tokens']
+
+    def record_usage(self, model: str, cache: str, prompt: str, response: str = '', outcome: str = 'ok',
+                     latency: Optional[float] = None, queue_delay: Optional[float] = None):
+        """Record a call's tokens and cost (or, for cache hits, what it saved) in self.metrics."""
+        config = self.llm_configs[model]
+        prompt_tokens, completion_tokens = self.count_tokens(prompt), self.count_tokens(response)
+        cost = (prompt_tokens * config.get('cost_per_1k_prompt', 0)
+                + completion_tokens * config.get('cost_per_1k_completion', 0)) / 1000
+        self.metrics.record(model, cache, outcome, prompt_tokens, completion_tokens, cost, latency, queue_delay)
+
+    def create_openai_client(self) -> aiohttp.ClientSession:
+        """Keep-alive HTTP session for the openai library's async calls."""
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=LLM_POOL_SIZE, keepalive_timeout=LLM_KEEPALIVE_TIMEOUT),
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        )
+
+    def create_anthropic_client(self) -> AsyncAnthropic:
+        # The SDK pools connections in its own HTTP client
+        return AsyncAnthropic(api_key=self.llm_configs['claude']['api_key'], timeout=REQUEST_TIMEOUT)
+
+    def create_google_client(self):
+        # The Gemini SDK keeps module-level state; configure it once per manager
+        genai.configure(api_key=self.llm_configs['gemini']['api_key'])
+        return genai
+
+    def client(self, model: str):
+        """Return the provider's long-lived client, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        old_loop = self._clients_loop() if self._clients_loop else None
+        if old_loop is not loop:
+            # Pooled connections belong to the event loop that opened them; close
+            # the old ones there before starting over on this loop
+            clients, self.clients = self.clients, {}
+            self._close_on_loop(old_loop, clients)
+            self._clients_loop = weakref.ref(loop)
+        if model not in self.clients:
+            self.clients[model] = self.client_factories[model]()
+        return self.clients[model]
+
+    def _close_on_loop(self, loop: Optional[asyncio.AbstractEventLoop], clients: Dict):
+        """Schedule clients' close on the loop that owns them; never drive that loop from here."""
+        if not clients:
+            return
+        if loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(loop.create_task, self._close_clients(clients))
+        else:
+            print(f"Dropping LLM clients ({', '.join(clients)}) whose event loop is no longer running")
+
+    def discard(self):
+        """Release what can be released without an event loop, once this manager's loop has closed."""
+        clients, self.clients = self.clients, {}
+        if clients:
+            print(f"Dropping LLM clients ({', '.join(clients)}) whose event loop closed before close()")
+        self.cache.close()
+
+    async def close(self):
+        """Close pooled provider connections; clients are recreated on next use."""
+        clients, self.clients = self.clients, {}
+        await self._close_clients(clients)
+
+    async def _close_clients(self, clients: Dict):
+        for model, client in clients.items():
+            close = getattr(client, 'close', None)
+            if close is None:
+                continue
+            try:
+                result = close()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                print(f"Error closing {model} client: {str(e)}")
 
     async def call_openai(self, prompt: str) -> str:
         """Call OpenAI's GPT-4 API."""
-        response = await openai.ChatCompletion.create(
+        openai.aiosession.set(self.client('gpt4'))
+        response = await openai.ChatCompletion.acreate(
             model="gpt-4",
             messages=[{"role": "user", "content": prompt}],
             max_tokens=self.llm_configs['gpt4']['max_tokens'],
-            temperature=self.llm_configs['gpt4']['temperature']
+            temperature=self.llm_configs['gpt4']['temperature'],
+            request_timeout=REQUEST_TIMEOUT
         )
         return response.choices[0].message.content.strip()
 
+    async def stream_openai(self, prompt: str) -> AsyncIterator[str]:
+        """Stream OpenAI's GPT-4 response as text chunks."""
+        openai.aiosession.set(self.client('gpt4'))
+        response = await openai.ChatCompletion.acreate(
+            model="gpt-4",
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=self.llm_configs['gpt4']['max_tokens'],
+            temperature=self.llm_configs['gpt4']['temperature'],
+            request_timeout=REQUEST_TIMEOUT,
+            stream=True
+        )
+        async for chunk in response:
+            content = chunk.choices[0].delta.get('content')
+            if content:
+                yield content
+
     async def call_anthropic(self, prompt: str) -> str:
         """Call Anthropic's Claude API."""
-        client = Anthropic(api_key=self.llm_configs['claude']['api_key'])
-        response = await client.completions.create(
+        response = await self.client('claude').completions.create(
             prompt=prompt,
             max_tokens=self.llm_configs['claude']['max_tokens'],
             temperature=self.llm_configs['claude']['temperature']
@@ -37,7 +186,7 @@ class LLMManager:
 
     async def call_google(self, prompt: str) -> str:
         """Call Google's Gemini API."""
-        response = await genai.ChatCompletion.create(
+        response = await self.client('gemini').ChatCompletion.create(
             model="gemini",
             messages=[{"role": "user", "content": prompt}],
             max_tokens=self.llm_configs['gemini']['max_tokens'],
@@ -45,26 +194,287 @@ class LLMManager:
         )
         return response.choices[0].message.content.strip()
 
-    async def manage_requests(self, func, *args, **kwargs):
-        """Manage rate limiting for API requests."""
-        while True:
-            current_time = time.time()
-            self.request_times = [t for t in self.request_times if t > current_time - self.rate_period]
-            if len(self.request_times) < self.rate_limit:
-                self.request_times.append(current_time)
-                return await func(*args, **kwargs)
-            await asyncio.sleep(1)
-
-    async def generate_response(self, prompt: str, model: str) -> str:
-        """Generate a response using the specified model."""
-        if model == 'gpt4':
-            return await self.manage_requests(self.call_openai, prompt)
-        elif model == 'claude':
-            return await self.manage_requests(self.call_anthropic, prompt)
-        elif model == 'gemini':
-            return await self.manage_requests(self.call_google, prompt)
-        else:
+    async def manage_requests(self, model: str, func, prompt: str, cache: str = 'miss'):
+        """Wait for the model's rate-limit budget, then make the request."""
+        queue_delay = await self.limiters[model].acquire(self.estimate_tokens(prompt, model))
+        # Raises CircuitOpenError if this provider's single half-open trial is already running
+        probe = self.health[model].begin_call()
+        start = time.monotonic()
+        try:
+            response = await func(prompt)
+        except asyncio.CancelledError:
+            self.health[model].record_abandoned(time.monotonic() - start, probe, current_stage.get())
+            self.record_usage(model, cache, prompt, outcome='abandoned', queue_delay=queue_delay)
+            raise
+        except Exception:
+            self.health[model].record_failure()
+            self.record_usage(model, cache, prompt, outcome='error', queue_delay=queue_delay)
+            raise
+        latency = time.monotonic() - start
+        self.record_latency(model, latency)
+        self.record_usage(model, cache, prompt, response, latency=latency, queue_delay=queue_delay)
+        return response
+
+    def record_latency(self, model: str, latency: float):
+        stage = current_stage.get()
+        self.latencies.setdefault((model, stage), deque(maxlen=100)).append(latency)
+        self.health[model].record_success(latency, stage)
+
+    def route_score(self, model: str) -> float:
+        """Higher is better: the provider's weight per expected second, discounted by its error rate.
+        Latency is the provider's EWMA for the current stage; providers without
+        a sample there yet are assumed to take HEDGE_DEFAULT_DELAY."""
+        health = self.health[model]
+        latency = health.stage_latency.get(current_stage.get(), HEDGE_DEFAULT_DELAY)
+        return self.llm_configs[model]['weight'] * (1 - health.error_rate) / max(latency, 0.001)
+
+    def provider_order(self) -> List[str]:
+        """Providers with an API key, best route_score first, skipping open circuits.
+        
+        If every configured provider's circuit is open, all of them are
+        returned anyway, so a request still has something to try.
+        """
+        configured = [model for model in self.providers if self.llm_configs[model].get('api_key')]
+        candidates = configured or list(self.providers)
+        healthy = [model for model in candidates if self.health[model].available()]
+        scores = {model: self.route_score(model) for model in candidates}
+        order = sorted(healthy or candidates, key=lambda model: scores[model], reverse=True)
+        self.routing_log.append({
+            'time': time.time(),
+            'order': order,
+            'skipped': [model for model in candidates if model not in order],
+            'scores': {model: round(score, 4) for model, score in scores.items()}
+        })
+        return order
+
+    def routing_snapshot(self) -> Dict:
+        """Per-provider health and the most recent routing decisions, for inspection."""
+        return {
+            'providers': {
+                model: {**health.snapshot(), 'weight': self.llm_configs[model]['weight'],
+                        'score': round(self.route_score(model), 4)}
+                for model, health in self.health.items()
+            },
+            'decisions': list(self.routing_log)
+        }
+
+    def hedge_delay(self, model: str, percentile: float = HEDGE_PERCENTILE) -> float:
+        """How long to wait on a provider before hedging: its latency percentile in the current stage."""
+        samples = sorted(self.latencies.get((model, current_stage.get()), ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return samples[min(int(percentile * len(samples)), len(samples) - 1)]
+
+    def cache_key(self, prompt: str, model: str) -> str:
+        """Key a response on everything that shapes it: model, prompt and sampling params."""
+        config = self.llm_configs[model]
+        return content_key(model, prompt, config['temperature'], config['max_tokens'])
+
+    async def generate_response(self, prompt: str, model: str, use_cache: bool = True) -> str:
+        """Generate a response using the specified model.
+        
+        Pass use_cache=False when a fresh, differently-sampled answer is wanted;
+        the new response still replaces the cached one.
+        """
+        if model not in self.providers:
+            raise ValueError("Unsupported model specified.")
+        
+        key = self.cache_key(prompt, model)
+        if not use_cache:
+            return await self._request(key, model, prompt, 'bypass')
+        
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.record_usage(model, 'hit', prompt, cached)
+            return cached
+        joining = key in self.in_flight
+        try:
+            response = await self.in_flight.run(key, lambda: self._request(key, model, prompt, 'miss'))
+        except asyncio.CancelledError:
+            if joining:
+                self.record_usage(model, 'coalesced', prompt, outcome='abandoned')
+            raise
+        except Exception:
+            # The leader recorded the call itself; joiners are tallied as coalesced
+            if joining:
+                self.record_usage(model, 'coalesced', prompt, outcome='error')
+            raise
+        if joining:
+            self.record_usage(model, 'coalesced', prompt, response)
+        return response
+
+    async def stream_response(self, prompt: str, model: str, use_cache: bool = True) -> AsyncIterator[str]:
+        """Yield the response as text chunks while the provider is still writing it.
+        
+        Cache hits and providers without streaming support yield the whole
+        response as a single chunk. A completed stream is cached like
+        generate_response.
+        """
+        if model not in self.providers:
             raise ValueError("Unsupported model specified.")
+        
+        key = self.cache_key(prompt, model)
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.record_usage(model, 'hit', prompt, cached)
+                yield cached
+                return
+        if model not in self.streaming_providers:
+            yield await self.generate_response(prompt, model, use_cache)
+            return
+        
+        cache = 'miss' if use_cache else 'bypass'
+        queue_delay = await self.limiters[model].acquire(self.estimate_tokens(prompt, model))
+        probe = self.health[model].begin_call()
+        start = time.monotonic()
+        chunks = []
+        try:
+            async for chunk in self.streaming_providers[model](prompt):
+                chunks.append(chunk)
+                yield chunk
+        except Exception:
+            self.health[model].record_failure()
+            self.record_usage(model, cache, prompt, ''.join(chunks), 'error', queue_delay=queue_delay)
+            raise
+        except BaseException:
+            # Cancelled or closed mid-stream
+            self.health[model].record_abandoned(time.monotonic() - start, probe, current_stage.get())
+            self.record_usage(model, cache, prompt, ''.join(chunks), 'abandoned', queue_delay=queue_delay)
+            raise
+        latency = time.monotonic() - start
+        self.record_latency(model, latency)
+        self.record_usage(model, cache, prompt, ''.join(chunks), latency=latency, queue_delay=queue_delay)
+        self.cache.set(key, ''.join(chunks).strip())
+
+    async def generate_hedged(self, prompt: str, models: Optional[List[str]] = None,
+                              use_cache: bool = True) -> str:
+        """Generate a response, hedging across providers instead of failing over serially.
+        
+        The first provider is asked alone. If it has not answered by its
+        latency percentile, or it fails, the next one is fired as well, and
+        so on; the first successful answer wins and the rest are cancelled.
+        """
+        remaining = list(models or self.provider_order())
+        pending = {}
+        errors = []
+        
+        def launch():
+            model = remaining.pop(0)
+            task = asyncio.ensure_future(self.generate_response(prompt, model, use_cache))
+            pending[task] = model
+            return model
+        
+        newest = launch()
+        try:
+            while pending:
+                timeout = self.hedge_delay(newest) if remaining else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    newest = launch()
+                    continue
+                for task in done:
+                    model = pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(f"{model}: {task.exception()}")
+                    if remaining:
+                        newest = launch()
+            raise Exception(f"All providers failed: {'; '.join(errors)}")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def stream_hedged(self, prompt: str, models: Optional[List[str]] = None,
+                            use_cache: bool = True) -> AsyncIterator[str]:
+        """Stream a response, hedging on time to first chunk like generate_hedged.
+        
+        The first provider's stream is started alone. If it hasn't produced a
+        chunk by its latency percentile, or it fails first, the next one is
+        started as well; the first stream to produce output is yielded to the
+        end and the others are cancelled. A failure after output has started
+        is raised to the caller.
+        """
+        remaining = list(models or self.provider_order())
+        pending = {}
+        streams = []
+        errors = []
+        
+        async def first_chunk(stream):
+            try:
+                return await stream.__anext__()
+            except StopAsyncIteration:
+                return ''
+        
+        def launch():
+            model = remaining.pop(0)
+            stream = self.stream_response(prompt, model, use_cache)
+            streams.append(stream)
+            pending[asyncio.ensure_future(first_chunk(stream))] = (model, stream)
+            return model
+        
+        newest = launch()
+        try:
+            while pending:
+                timeout = self.hedge_delay(newest) if remaining else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    newest = launch()
+                    continue
+                winner = None
+                for task in done:
+                    model, stream = pending.pop(task)
+                    if task.exception() is None:
+                        winner = winner or (task.result(), stream)
+                    else:
+                        errors.append(f"{model}: {task.exception()}")
+                if winner:
+                    for task in pending:
+                        task.cancel()
+                    await asyncio.gather(*pending, return_exceptions=True)
+                    pending.clear()
+                    chunk, stream = winner
+                    if chunk:
+                        yield chunk
+                    async for chunk in stream:
+                        yield chunk
+                    return
+                if remaining:
+                    newest = launch()
+            raise Exception(f"All providers failed: {'; '.join(errors)}")
+        finally:
+            for task in pending:
+                task.cancel()
+            # Let cancelled first-chunk reads unwind before closing their streams
+            await asyncio.gather(*pending, return_exceptions=True)
+            for stream in streams:
+                await stream.aclose()
+
+    async def _request(self, key: str, model: str, prompt: str, cache: str) -> str:
+        response = await self.manage_requests(model, self.providers[model], prompt, cache)
+        self.cache.set(key, response)
+        return response
+
+# One manager per event loop: clients, limiter waiters and in-flight requests are loop-bound
+# (main.py runs the Quart app and its auto-run thread on different loops). Usage metrics
+# are shared so /llm-usage covers the whole process. A manager refers back to its loop
+# through its limiters and tasks, so entries for closed loops are evicted explicitly.
+_shared_managers: Dict[asyncio.AbstractEventLoop, LLMManager] = {}
+_shared_metrics = LLMMetrics()
+_shared_lock = threading.Lock()
+
+def shared_llm_manager() -> LLMManager:
+    """The LLMManager for the running event loop, so its callers share clients, cache and rate limits."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = asyncio.get_event_loop()
+    with _shared_lock:
+        for closed in [other for other in _shared_managers if other.is_closed()]:
+            _shared_managers.pop(closed).discard()
+        if loop not in _shared_managers:
+            _shared_managers[loop] = LLMManager(metrics=_shared_metrics)
+        return _shared_managers[loop]
 
 def main():
     """Test the LLMManager with a sample prompt."""
@@ -72,8 +482,11 @@ def main():
     prompt = "What is the weirdest news story you can think of?"
     
     loop = asyncio.get_event_loop()
-    response = loop.run_until_complete(manager.generate_response(prompt, 'gpt4'))
-    print("Response from GPT-4:", response)
+    try:
+        response = loop.run_until_complete(manager.generate_response(prompt, 'gpt4'))
+        print("Response from GPT-4:", response)
+    finally:
+        loop.run_until_complete(manager.close())
 
 if __name__ == "__main__":
     main()
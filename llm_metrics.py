@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence
+from config import LLM_METRICS_LOG
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)  # Seconds
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+COUNTERS = (
+    'calls', 'errors', 'abandoned', 'cache_hit', 'cache_miss', 'coalesced', 'bypass',
+    'coalesced_errors', 'coalesced_abandoned',
+    'prompt_tokens', 'completion_tokens', 'cost', 'tokens_saved', 'cost_saved'
+)
+
+# Set by pipeline stages and runs; tasks inherit them, so nested LLM calls are attributed correctly
+current_stage: ContextVar[str] = ContextVar('llm_stage', default='unlabelled')
+current_run: ContextVar[Optional['LLMUsage']] = ContextVar('llm_run', default=None)
+
+class Histogram:
+    def __init__(self, bounds: Sequence[float]):
+        """Fixed-bucket histogram; the last bucket catches everything above the top bound."""
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation (None past the top bucket)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self) -> Dict:
+        labels = [f"<={bound}" for bound in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 3) if self.count else None,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'buckets': {label: count for label, count in zip(labels, self.counts) if count}
+        }
+
+class LLMUsage:
+    def __init__(self):
+        """Counters and histograms of LLM calls, keyed by (provider, stage)."""
+        self.started_at = time.time()
+        self.counters: Dict[tuple, Dict[str, float]] = {}
+        self.histograms: Dict[tuple, Dict[str, Histogram]] = {}
+        # Shared by the per-event-loop LLMManagers, which may run in different threads
+        self._lock = threading.Lock()
+
+    def _series(self, key: tuple):
+        if key not in self.counters:
+            self.counters[key] = dict.fromkeys(COUNTERS, 0)
+            self.histograms[key] = {
+                'latency': Histogram(LATENCY_BUCKETS),
+                'queue_delay': Histogram(LATENCY_BUCKETS),
+                'prompt_tokens': Histogram(TOKEN_BUCKETS),
+                'completion_tokens': Histogram(TOKEN_BUCKETS)
+            }
+        return self.counters[key], self.histograms[key]
+
+    def record(self, provider: str, stage: str, cache: str, outcome: str, prompt_tokens: int,
+               completion_tokens: int, cost: float, latency: Optional[float], queue_delay: Optional[float]):
+        with self._lock:
+            self._record(provider, stage, cache, outcome, prompt_tokens, completion_tokens,
+                         cost, latency, queue_delay)
+
+    def _record(self, provider, stage, cache, outcome, prompt_tokens, completion_tokens,
+                cost, latency, queue_delay):
+        counters, histograms = self._series((provider, stage))
+        counters[f"cache_{cache}" if cache in ('hit', 'miss') else cache] += 1
+        if cache in ('hit', 'coalesced'):
+            # Served without an API call of our own; a joiner shares the leader's failure
+            if outcome == 'ok':
+                counters['tokens_saved'] += prompt_tokens + completion_tokens
+                counters['cost_saved'] += cost
+            elif cache == 'coalesced':
+                counters[f"coalesced_{'errors' if outcome == 'error' else 'abandoned'}"] += 1
+            return
+
+        counters['calls'] += 1
+        if outcome == 'error':
+            counters['errors'] += 1
+        elif outcome == 'abandoned':
+            counters['abandoned'] += 1
+        counters['prompt_tokens'] += prompt_tokens
+        counters['completion_tokens'] += completion_tokens
+        counters['cost'] += cost
+        if queue_delay is not None:
+            histograms['queue_delay'].observe(queue_delay)
+        if outcome == 'ok':
+            histograms['latency'].observe(latency)
+            histograms['prompt_tokens'].observe(prompt_tokens)
+            histograms['completion_tokens'].observe(completion_tokens)
+
+    def snapshot(self, provider: Optional[str] = None, stage: Optional[str] = None) -> Dict:
+        """Totals plus per-(provider, stage) counters and histograms, optionally filtered."""
+        with self._lock:
+            return self._snapshot(provider, stage)
+
+    def _snapshot(self, provider: Optional[str], stage: Optional[str]) -> Dict:
+        totals = dict.fromkeys(COUNTERS, 0)
+        series = []
+        for (series_provider, series_stage), counters in sorted(self.counters.items()):
+            if provider not in (None, series_provider) or stage not in (None, series_stage):
+                continue
+            for name, value in counters.items():
+                totals[name] += value
+            series.append({
+                'provider': series_provider,
+                'stage': series_stage,
+                **{name: round(value, 6) if name.startswith('cost') else value for name, value in counters.items()},
+                **{name: histogram.snapshot() for name, histogram in self.histograms[(series_provider, series_stage)].items()}
+            })
+        totals['cost'] = round(totals['cost'], 6)
+        totals['cost_saved'] = round(totals['cost_saved'], 6)
+        return {'started_at': self.started_at, 'totals': totals, 'series': series}
+
+class LLMMetrics:
+    def __init__(self, log_path: str = LLM_METRICS_LOG):
+        """Process-wide LLM usage, plus per-run usage dumped to a JSON-lines log."""
+        self.log_path = os.path.expanduser(log_path)
+        self.total = LLMUsage()
+
+    def record(self, provider: str, cache: str, outcome: str = 'ok', prompt_tokens: int = 0,
+               completion_tokens: int = 0, cost: float = 0.0, latency: Optional[float] = None,
+               queue_delay: Optional[float] = None):
+        """Record one generate call: cache is 'hit', 'miss', 'coalesced' or 'bypass';
+        outcome is 'ok', 'error' or 'abandoned' (cancelled, e.g. a losing hedge).
+        
+        'coalesced' calls joined another caller's request and are counted apart
+        from calls, so their errors don't double-count the one failed request."""
+        event = (provider, current_stage.get(), cache, outcome, prompt_tokens,
+                 completion_tokens, cost, latency, queue_delay)
+        self.total.record(*event)
+        run = current_run.get()
+        if run is not None:
+            run.record(*event)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Attribute LLM calls made inside the block (and tasks it starts) to a pipeline stage."""
+        token = current_stage.set(name)
+        try:
+            yield
+        finally:
+            current_stage.reset(token)
+
+    @contextmanager
+    def run(self, name: str):
+        """Collect the block's LLM usage separately and append it to the log when it ends."""
+        usage = LLMUsage()
+        token = current_run.set(usage)
+        try:
+            yield usage
+        finally:
+            current_run.reset(token)
+            self.dump(name, usage)
+
+    def dump(self, name: str, usage: Optional[LLMUsage] = None):
+        """Append a usage snapshot (the process totals by default) to the metrics log."""
+        snapshot = (usage or self.total).snapshot()
+        try:
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps({'run': name, 'finished_at': time.time(), **snapshot}) + "\n")
+        except OSError as e:
+            print(f"Error writing LLM metrics: {str(e)}")
@@ -6,7 +6,10 @@ import json
 import subprocess
 import tempfile
 import asyncio
+import random
+import functools
 import aiohttp
+import numpy as np
 from dotenv import load_dotenv
 import openai
 from google.cloud import language_v1
@@ -14,8 +17,21 @@ from supabase import create_client, Client
 import praw
 import tweepy
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from script_generator import ScriptGenerator
+from llm_manager import shared_llm_manager
+from download_engine import shared_download_engine
 from video_pipeline import VideoPipeline
+from ingest_state import IngestState
+from dedup import Deduplicator
+from disk_cache import DiskCache, content_key
+from news_scraper import local_weirdness_scores
+from config import (
+    SOURCE_TIMEOUT, SOURCE_ATTEMPT_TIMEOUT, SOURCE_MAX_RETRIES,
+    SOURCE_BACKOFF_BASE, SOURCE_BACKOFF_MAX,
+    SCORE_CACHE_PATH, SCORE_CACHE_TTL, SCORE_CACHE_MAX_ENTRIES,
+    GPT_SCORE_BATCH_SIZE, GPT_FALLBACK_CONCURRENCY, NLP_MAX_CONCURRENCY, CASCADE_TOP_K, CASCADE_EXPLORE, CASCADE_SHADOW_RATE
+)
 
 # Load environment variables
 load_dotenv()
@@ -43,6 +59,7 @@ BASE_DIR = os.path.expanduser("~/weird_news_pipeline")
 LOG_FILE = os.path.join(BASE_DIR, "pipeline_log.json")
 SCRIPTS_DIR = os.path.join(BASE_DIR, "scripts")
 VIDEOS_DIR = os.path.join(BASE_DIR, "videos")
+CASCADE_LOG_FILE = os.path.join(BASE_DIR, "cascade_log.jsonl")
 
 # Ensure directories exist
 for directory in [BASE_DIR, SCRIPTS_DIR, VIDEOS_DIR]:
@@ -61,20 +78,45 @@ def log_event(event):
 
 class NewsSource:
     """Base class for news sources"""
+    def __init__(self, state=None):
+        # Shared incremental-ingestion state (cursors, seen IDs)
+        self.state = state or IngestState()
+
+    @property
+    def name(self):
+        return self.__class__.__name__
+
     async def fetch_articles(self):
         raise NotImplementedError
 
+    def advance_cursors(self, articles, failed):
+        """Move this source's cursors past articles from the last fetch once they are scored.
+
+        Cursors stop at the earliest of `failed` (articles whose scoring failed) so they are refetched.
+        """
+        pass
+
 class NewsAPIScraper(NewsSource):
     async def fetch_articles(self):
-        """Fetch articles from NewsAPI asynchronously"""
+        """Fetch articles published since the last run from NewsAPI asynchronously"""
+        params = {}
+        published_since = self.state.get_cursor(self.name, 'from')
+        if published_since:
+            params['from'] = published_since
         async with aiohttp.ClientSession() as session:
             url = f"https://newsapi.org/v2/everything?q=weird OR strange OR unusual&apiKey={newsapi_key}"
-            async with session.get(url) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
                     data = await response.json()
                     return data.get('articles', [])
                 return []
 
+    def advance_cursors(self, articles, failed):
+        # 'from' is inclusive; already-handled articles at the boundary are filtered as seen
+        published = [a['publishedAt'] for a in (failed or articles) if a.get('publishedAt')]
+        if published:
+            self.state.set_cursor(self.name, 'from', min(published) if failed else max(published))
+
 class RedditScraper(NewsSource):
     reddit = None
     async def fetch_articles(self):
@@ -113,17 +155,49 @@ class TwitterScraper(NewsSource):
         query = "weird news OR strange news OR unusual news"
         tweets = await twitter_client.search_recent_tweets(
             query=query,
-            max_results=100
+            max_results=100,
+            since_id=self.state.get_cursor(self.name, 'since_id')
         )
         return [{
             'title': tweet.text,
             'url': f"https://twitter.com/x/status/{tweet.id}",
-            'source': 'twitter'
+            'source': 'twitter',
+            'tweet_id': str(tweet.id)
         } for tweet in tweets.data] if tweets.data else []
 
+    def advance_cursors(self, articles, failed):
+        # since_id is exclusive, so stop just before the earliest failed tweet
+        tweet_ids = [int(a['tweet_id']) for a in (failed or articles) if a.get('tweet_id')]
+        if tweet_ids:
+            self.state.set_cursor(self.name, 'since_id', str(min(tweet_ids) - 1) if failed else str(max(tweet_ids)))
+
+# Middle of GPT's 1-10 scale, for articles it could not rate
+NEUTRAL_GPT_SCORE = 5.0
+
+# The NLP client is blocking; its calls run here so event loops stay free. One pool
+# for the process, so NLP_MAX_CONCURRENCY caps concurrent runs together
+nlp_executor = ThreadPoolExecutor(max_workers=NLP_MAX_CONCURRENCY, thread_name_prefix='google-nlp')
+
 class WeirdnessScorer:
-    def __init__(self):
+    def __init__(self, executor=None):
         self.language_client = language_v1.LanguageServiceClient()
+        # Shared with every other scorer unless one is passed in
+        self.nlp_executor = executor or nlp_executor
+        # GPT scores and entity saliences are cached separately so reweighting
+        # the final score never has to re-query either API
+        self.cache = DiskCache(SCORE_CACHE_PATH, max_entries=SCORE_CACHE_MAX_ENTRIES, ttl=SCORE_CACHE_TTL)
+        # Scores are routed to whichever provider is currently fastest and healthy
+        self.llm_manager = shared_llm_manager()
+
+    @staticmethod
+    def cache_key(kind, text):
+        """Key a cached result on the normalized article text."""
+        return f"{kind}:{content_key(' '.join(text.lower().split()))}"
+
+    @staticmethod
+    def article_text(article):
+        """Combine title and description for analysis"""
+        return f"{article.get('title', '')} {article.get('description', '')}"
 
     async def analyze_entities(self, text):
         """Analyze entities in text using Google Cloud NLP"""
@@ -131,34 +205,143 @@ class WeirdnessScorer:
             content=text,
             type_=language_v1.Document.Type.PLAIN_TEXT
         )
-        return self.language_client.analyze_entities(document=document)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.nlp_executor,
+            functools.partial(self.language_client.analyze_entities, document=document)
+        )
+
+    async def get_entity_saliences(self, text):
+        """Return [{'name', 'salience'}] for the text's entities, from cache when possible"""
+        key = self.cache_key('entities', text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        entity_analysis = await self.analyze_entities(text)
+        saliences = [{'name': entity.name, 'salience': entity.salience}
+                     for entity in entity_analysis.entities]
+        self.cache.set(key, saliences)
+        return saliences
 
     async def get_gpt_weirdness_score(self, text):
         """Use GPT to determine weirdness score"""
-        response = await openai.ChatCompletion.acreate(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "Rate the weirdness of this news story on a scale of 1-10, where 10 is the weirdest. Respond with just the number."},
-                {"role": "user", "content": text}
-            ]
-        )
+        key = self.cache_key('gpt', text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        # Parsed scores are cached above, so skip the raw response cache; a garbled reply is retried
+        with self.llm_manager.metrics.stage('weirdness_score'):
+            content = await self.llm_manager.generate_hedged(
+                "Rate the weirdness of this news story on a scale of 1-10, where 10 is the weirdest. "
+                f"Respond with just the number.\n\n{text}",
+                use_cache=False
+            )
+        try:
+            score = float(content.strip())
+        except ValueError:
+            return NEUTRAL_GPT_SCORE  # Not cached, so an unparseable reply is retried next time
+        self.cache.set(key, score)
+        return score
+
+    @staticmethod
+    def parse_batch_scores(content, count):
+        """Parse a {"<index>": score} JSON reply, keeping only valid in-range entries"""
+        content = content.strip()
+        start, end = content.find('{'), content.rfind('}')
+        if start == -1 or end == -1:
+            return {}
         try:
-            return float(response.choices[0].message.content.strip())
+            data = json.loads(content[start:end + 1])
         except ValueError:
-            return 5.0
+            return {}
+
+        scores = {}
+        for index, score in data.items():
+            try:
+                index, score = int(index), float(score)
+            except (TypeError, ValueError):
+                continue
+            if 0 <= index < count and 1 <= score <= 10:
+                scores[index] = score
+        return scores
+
+    async def score_batch(self, texts):
+        """Rate several stories in one GPT request; returns {index: score} for valid replies"""
+        numbered = "\n".join(f"{i}. {' '.join(text.split())}" for i, text in enumerate(texts))
+        with self.llm_manager.metrics.stage('weirdness_score_batch'):
+            content = await self.llm_manager.generate_hedged(
+                "Rate the weirdness of each numbered news story on a scale of 1-10, where 10 is the weirdest. "
+                "Respond with only a JSON object mapping every story number to its score, e.g. {\"0\": 7, \"1\": 3}."
+                f"\n\n{numbered}",
+                use_cache=False
+            )
+        return self.parse_batch_scores(content, len(texts))
+
+    async def get_gpt_weirdness_scores(self, texts, batch_size=GPT_SCORE_BATCH_SIZE):
+        """Score many texts with one GPT request per batch, falling back per item.
+        
+        Texts that could not be scored at all are left as None.
+        """
+        scores = [None] * len(texts)
+        pending = []
+        for i, text in enumerate(texts):
+            cached = self.cache.get(self.cache_key('gpt', text))
+            if cached is not None:
+                scores[i] = cached
+            else:
+                pending.append(i)
+
+        chunks = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        results = await asyncio.gather(
+            *(self.score_batch([texts[i] for i in chunk]) for chunk in chunks),
+            return_exceptions=True
+        )
+
+        fallback = []
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, Exception):
+                log_event(f"Batch GPT scoring failed, scoring {len(chunk)} articles individually: {str(result)}")
+                result = {}
+            for position, i in enumerate(chunk):
+                if position in result:
+                    scores[i] = result[position]
+                    self.cache.set(self.cache_key('gpt', texts[i]), result[position])
+                else:
+                    fallback.append(i)
+
+        # Only the items the batch reply missed or garbled cost an individual call
+        if fallback:
+            log_event(f"Scoring {len(fallback)} articles individually after batch parse failures")
+            # A failed batch can leave many items; don't fire them all at the provider at once
+            slots = asyncio.Semaphore(GPT_FALLBACK_CONCURRENCY)
+
+            async def score_one(text):
+                async with slots:
+                    return await self.get_gpt_weirdness_score(text)
 
-    async def calculate_weirdness_score(self, article):
-        """Calculate overall weirdness score"""
-        # Combine title and description for analysis
-        text = f"{article.get('title', '')} {article.get('description', '')}"
+            individual = await asyncio.gather(*(score_one(texts[i]) for i in fallback), return_exceptions=True)
+            failures = 0
+            for i, score in zip(fallback, individual):
+                if isinstance(score, Exception):
+                    failures += 1
+                else:
+                    scores[i] = score
+            if failures:
+                log_event(f"GPT scoring failed for {failures} of {len(fallback)} articles")
+        return scores
+
+    async def calculate_weirdness_score(self, article, gpt_score=None):
+        """Calculate overall weirdness score, reusing a pre-computed (batched) GPT score if given"""
+        text = self.article_text(article)
         
         # Get GPT weirdness score
-        gpt_score = await self.get_gpt_weirdness_score(text)
+        if gpt_score is None:
+            gpt_score = await self.get_gpt_weirdness_score(text)
         
         # Analyze entities
-        entity_analysis = await self.analyze_entities(text)
-        unusual_entities = len([entity for entity in entity_analysis.entities
-                              if entity.salience > 0.3])
+        saliences = await self.get_entity_saliences(text)
+        unusual_entities = len([entity for entity in saliences
+                              if entity['salience'] > 0.3])
         
         # Calculate engagement score
         engagement_score = min(article.get('score', 0) / 1000, 10)
@@ -174,50 +357,191 @@ class WeirdnessScorer:
 
 class NewsPipeline:
     def __init__(self):
+        self.state = IngestState()
         self.sources = [
-            NewsAPIScraper(),
-            RedditScraper(),
-            TwitterScraper()
+            NewsAPIScraper(self.state),
+            RedditScraper(self.state),
+            TwitterScraper(self.state)
         ]
+        self.deduplicator = Deduplicator()
         self.scorer = WeirdnessScorer()
 
+    async def fetch_source(self, source):
+        """Fetch one source within its own deadline, retrying with jittered backoff."""
+        name = source.name
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + SOURCE_TIMEOUT
+        articles = []
+        stats = {'source': name, 'status': 'failed', 'attempts': 0}
+
+        for attempt in range(SOURCE_MAX_RETRIES):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                stats['status'] = 'timeout'
+                break
+            stats['attempts'] = attempt + 1
+            try:
+                articles = await asyncio.wait_for(
+                    source.fetch_articles(),
+                    timeout=min(SOURCE_ATTEMPT_TIMEOUT, remaining)
+                )
+                stats['status'] = 'ok'
+                break
+            except asyncio.TimeoutError:
+                stats['status'] = 'timeout'
+                log_event(f"Timed out fetching from {name} (Attempt {attempt + 1}/{SOURCE_MAX_RETRIES})")
+            except Exception as e:
+                stats['status'] = 'failed'
+                stats['error'] = str(e)
+                log_event(f"Error fetching from {name} (Attempt {attempt + 1}/{SOURCE_MAX_RETRIES}): {str(e)}")
+
+            if attempt < SOURCE_MAX_RETRIES - 1:
+                # Full jitter keeps retrying sources from hammering an API in lockstep
+                backoff = random.uniform(0, min(SOURCE_BACKOFF_MAX, SOURCE_BACKOFF_BASE * 2 ** attempt))
+                backoff = min(backoff, deadline - loop.time())
+                if backoff > 0:
+                    await asyncio.sleep(backoff)
+
+        stats['items'] = len(articles)
+        stats['latency'] = round(loop.time() - start, 3)
+        if stats['status'] == 'ok':
+            log_event(f"Fetched {len(articles)} articles from {name} in {stats['latency']}s")
+        else:
+            log_event(f"Failed to fetch from {name} ({stats['status']}) after {stats['attempts']} attempts")
+        return articles, stats
+
+    def select_candidates(self, articles):
+        """Rank articles with the free local heuristic and keep the top-K plus an exploration sample."""
+        local_scores = local_weirdness_scores(articles)
+        local_ranked = [articles[i] for i in np.argsort(-local_scores, kind='stable')]
+        top_k = local_ranked[:CASCADE_TOP_K]
+        rest = local_ranked[CASCADE_TOP_K:]
+        explore = random.sample(rest, min(CASCADE_EXPLORE, len(rest)))
+        return local_ranked, top_k + explore, {a['id'] for a in explore}
+
+    def record_cascade(self, local_ranked, explore_ids, candidates, winner, shadow_winner=None):
+        """Log how the cascade winner ranked locally, for tuning K.
+
+        overturned_local_top only says the full scorer disagreed with the
+        local #1. Whether the cascade missed the true winner is only known on
+        shadow runs, which fully score every article: shadow_winner_matches
+        compares the two winners there and is None otherwise.
+        """
+        local_rank = next(i for i, a in enumerate(local_ranked) if a['id'] == winner['id'])
+        stats = {
+            'timestamp': time.time(),
+            'articles': len(local_ranked),
+            'top_k': CASCADE_TOP_K,
+            'candidates': candidates,
+            'explored': len(explore_ids),
+            'winner_local_rank': local_rank,
+            'overturned_local_top': local_rank != 0,
+            'winner_from_exploration': winner['id'] in explore_ids,
+            'shadow': shadow_winner is not None,
+            'shadow_winner_matches': shadow_winner['id'] == winner['id'] if shadow_winner else None
+        }
+        with open(CASCADE_LOG_FILE, "a") as f:
+            f.write(json.dumps(stats) + "\n")
+        shadow_note = ''
+        if shadow_winner is not None:
+            shadow_note = f" (shadow run: {'matched' if stats['shadow_winner_matches'] else 'missed'} the full-scoring winner)"
+        log_event(f"Cascade: winner was local rank {local_rank} of {len(local_ranked)}"
+                  f"{' (exploration sample)' if stats['winner_from_exploration'] else ''}{shadow_note}")
+        return stats
+
     async def run(self):
         """Run the full pipeline"""
-        # 1. Collect articles from all sources
+        # 1. Collect articles from all sources concurrently; a source that
+        # misses its deadline contributes nothing instead of stalling the rest
+        ingest_start = time.time()
+        results = await asyncio.gather(*(self.fetch_source(source) for source in self.sources))
         all_articles = []
-        for source in self.sources:
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    articles = await source.fetch_articles()
-                    all_articles.extend(articles)
-                    log_event(f"Fetched {len(articles)} articles from {source.__class__.__name__}")
-                    break  # Break the retry loop if successful
-                except Exception as e:
-                    log_event(f"Error fetching from {source.__class__.__name__} (Attempt {attempt + 1}/{max_retries}): {str(e)}")
-                    if attempt == max_retries - 1:
-                        log_event(f"Failed to fetch from {source.__class__.__name__} after multiple retries.")
-                    await asyncio.sleep(5)  # Wait before retrying
-
-        # 2. Score and rank articles
+        source_stats = []
+        fresh_by_source = {}
+        for source, (articles, stats) in zip(self.sources, results):
+            # Only items not handled by a previous run go on to scoring
+            fresh = self.state.unseen(source.name, articles, key=lambda a: a['url'])
+            fresh_by_source[source.name] = fresh
+            stats['new_items'] = len(fresh)
+            all_articles.extend(fresh)
+            source_stats.append(stats)
+        log_event(f"Ingested {len(all_articles)} articles from {len(self.sources)} sources in {time.time() - ingest_start:.2f}s")
+
+        # Collapse copies of the same story so each is scored once
+        all_articles = await self.deduplicator.dedupe(all_articles)
+
+        # 2. Prefilter locally so only the likeliest candidates reach GPT + NLP
+        local_ranked, candidates, explore_ids = self.select_candidates(all_articles)
+        candidate_ids = {a['id'] for a in candidates}
+        # Occasionally score everything as well, to check the cascade against the full ranking
+        shadow = len(candidates) < len(all_articles) and random.random() < CASCADE_SHADOW_RATE
+        to_score = all_articles if shadow else candidates
+        log_event(f"Cascade sending {len(candidates)} of {len(all_articles)} articles to the full scorer"
+                  f"{' (shadow run: scoring all)' if shadow else ''}")
+
+        # 3. Score and rank candidates, rating GPT weirdness in batches up front
+        try:
+            gpt_scores = await self.scorer.get_gpt_weirdness_scores(
+                [self.scorer.article_text(article) for article in to_score]
+            )
+        except Exception as e:
+            log_event(f"Error batch scoring articles: {str(e)}")
+            gpt_scores = [None] * len(to_score)
+
+        # GPT already failed for these; score them as neutral (the same 5.0 an unparseable
+        # reply gets) rather than asking again per article, and flag them
+        missing = [i for i, score in enumerate(gpt_scores) if score is None]
+        if missing:
+            for i in missing:
+                gpt_scores[i] = NEUTRAL_GPT_SCORE
+                to_score[i]['gpt_score_missing'] = True
+            log_event(f"Using the neutral GPT score for {len(missing)} articles GPT could not score")
+
+        # Entity analysis for all candidates runs in parallel, capped by the NLP pool
+        scores = await asyncio.gather(
+            *(self.scorer.calculate_weirdness_score(article, gpt_score)
+              for article, gpt_score in zip(to_score, gpt_scores)),
+            return_exceptions=True
+        )
+
         scored_articles = []
-        for article in all_articles:
-            try:
-                score = await self.scorer.calculate_weirdness_score(article)
-                article['weirdness_score'] = score
-                scored_articles.append(article)
-                log_event(f"Scored article: {article['title']} - Score: {score}")
-            except Exception as e:
-                log_event(f"Error scoring article: {str(e)}")
+        failed_ids = set()
+        for article, score in zip(to_score, scores):
+            if isinstance(score, Exception):
+                failed_ids.add(article['id'])
+                log_event(f"Error scoring article: {str(score)}")
+                continue
+            article['weirdness_score'] = score
+            scored_articles.append(article)
+            log_event(f"Scored article: {article['title']} - Score: {score}")
 
-        # 3. Sort by weirdness score
+        # Only now that scoring is done do cursors advance and handled items
+        # (duplicates included) get marked seen; stories whose scoring failed
+        # stay behind the cursor and are retried next run
+        for source, (articles, _) in zip(self.sources, results):
+            fresh = fresh_by_source[source.name]
+            failed = [a for a in fresh if a.get('id') in failed_ids]
+            source.advance_cursors(articles, failed)
+            self.state.mark_seen(source.name, (a['url'] for a in fresh if a.get('id') not in failed_ids))
+        self.state.save()
+
+        # 4. Sort by weirdness score
         ranked_articles = sorted(
             scored_articles,
             key=lambda x: x.get('weirdness_score', 0),
             reverse=True
         )
+        # On shadow runs the pipeline still publishes the cascade's pick, so the audit doesn't change output
+        if shadow:
+            shadow_winner = ranked_articles[0] if ranked_articles else None
+            ranked_articles = [a for a in ranked_articles if a['id'] in candidate_ids]
+        else:
+            shadow_winner = None
+        cascade_stats = self.record_cascade(local_ranked, explore_ids, len(candidates), ranked_articles[0],
+                                            shadow_winner) if ranked_articles else None
 
-        # 4. Store top articles in Supabase
+        # 5. Store top articles in Supabase
         if ranked_articles:
             top_article = ranked_articles[0]
             try:
@@ -243,6 +567,8 @@ class NewsPipeline:
             
             result = {
                 "status": "success",
+                "sources": source_stats,
+                "cascade": cascade_stats,
                 "articles": ranked_articles[:10],
                 "script": {
                     "path": script_path,
@@ -253,16 +579,25 @@ class NewsPipeline:
         else:
             result = {
                 "status": "success",
+                "sources": source_stats,
                 "articles": []
             }
         return result
 
+@app.after_serving
+async def close_llm_clients():
+    """Close the shared LLM provider and download connections on shutdown."""
+    await shared_llm_manager().close()
+    await shared_download_engine().close()
+    nlp_executor.shutdown(wait=False)
+
 @app.route('/run', methods=['POST'])
 async def run_pipeline():
     """Endpoint to trigger pipeline execution"""
     try:
         pipeline = NewsPipeline()
-        result = await pipeline.run()
+        with shared_llm_manager().metrics.run('news_pipeline'):
+            result = await pipeline.run()
         return jsonify({
             "status": "success",
             **result
@@ -273,6 +608,25 @@ async def run_pipeline():
             "message": str(e)
         }), 500
 
+@app.route('/llm-routing', methods=['GET'])
+async def get_llm_routing():
+    """Inspect LLM provider health and recent routing decisions"""
+    return jsonify({
+        "status": "success",
+        **shared_llm_manager().routing_snapshot()
+    })
+
+@app.route('/llm-usage', methods=['GET'])
+async def get_llm_usage():
+    """LLM tokens, cost, latency and cache outcomes since startup, optionally per provider/stage"""
+    return jsonify({
+        "status": "success",
+        **shared_llm_manager().metrics.total.snapshot(
+            provider=request.args.get('provider'),
+            stage=request.args.get('stage')
+        )
+    })
+
 @app.route('/top', methods=['GET'])
 async def get_top_articles():
     """Get today's top weird news articles"""
@@ -304,7 +658,8 @@ async def generate_video():
         
         # Start video generation
         try:
-            output_path = await pipeline.generate_daily_video()
+            with shared_llm_manager().metrics.run('generate_video'):
+                output_path = await pipeline.generate_daily_video()
             
             # Store video info in Supabase
             video_info = {
@@ -385,7 +740,8 @@ async def auto_run():
     while True:
         try:
             pipeline = NewsPipeline()
-            await pipeline.run()
+            with shared_llm_manager().metrics.run('auto_run'):
+                await pipeline.run()
             log_event("Auto-run completed successfully")
         except Exception as e:
             log_event(f"Auto-run failed: {str(e)}")
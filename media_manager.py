@@ -4,11 +4,13 @@ import aiohttp
 from typing import Dict, List, Optional
 from image_manager import ImageManager
 from stock_footage_manager import StockFootageManager
+from download_engine import shared_download_engine
 
 class MediaManager:
     def __init__(self):
         self.image_manager = ImageManager()  # For Stability AI image generation
         self.stock_manager = StockFootageManager()  # For Pexels stock footage
+        self.downloader = shared_download_engine()
         
         # Base directories
         self.base_dir = os.path.expanduser("~/weird_news_pipeline/media")
@@ -79,20 +81,17 @@ class MediaManager:
                             filename = f"stock_{int(asyncio.get_event_loop().time())}.jpg"
                             filepath = os.path.join(self.stock_dir, filename)
                             
-                            async with session.get(photo["src"]["original"]) as img_response:
-                                if img_response.status == 200:
-                                    with open(filepath, "wb") as f:
-                                        f.write(await img_response.read())
-                                    
-                                    return {
-                                        "type": "stock_photo",
-                                        "path": filepath,
-                                        "metadata": {
-                                            "source": "pexels",
-                                            "id": photo["id"],
-                                            "photographer": photo["photographer"]
-                                        }
-                                    }
+                            await self.downloader.download(photo["src"]["original"], filepath)
+                            
+                            return {
+                                "type": "stock_photo",
+                                "path": filepath,
+                                "metadata": {
+                                    "source": "pexels",
+                                    "id": photo["id"],
+                                    "photographer": photo["photographer"]
+                                }
+                            }
             return None
         except Exception as e:
             print(f"Error fetching stock photo: {str(e)}")
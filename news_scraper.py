@@ -1,19 +1,156 @@
 import os
 import asyncio
 import aiohttp
-import json
 import schedule
 import time
+import numpy as np
 from datetime import datetime
 from bs4 import BeautifulSoup
-from typing import List, Dict
-from config import STOCK_FOOTAGE_CONFIGS
+from typing import List, Dict, Optional, Sequence, Union
+from config import STOCK_FOOTAGE_CONFIGS, REQUEST_TIMEOUT, CURSOR_MAX_AGE, WEIRDEST_WINDOW_HOURS
+from rate_limiter import HostRateLimiter
+from ingest_state import IngestState
+from dedup import Deduplicator, content_id
+from article_store import ArticleStore
+
+WEIRD_KEYWORDS = ['bizarre', 'strange', 'unusual', 'mysterious', 'unexpected',
+                  'surprising', 'odd', 'weird', 'incredible', 'unbelievable']
+
+def local_weirdness_score(article: Dict) -> float:
+    """Calculate a free weirdness score from title keywords, engagement and recency."""
+    score = 0.0
+    
+    # Check title for weird keywords
+    title_lower = (article.get('title') or '').lower()
+    
+    # Add points for each weird keyword
+    score += sum(2.0 for keyword in WEIRD_KEYWORDS if keyword in title_lower)
+    
+    # Add points for engagement (if available)
+    if 'score' in article:
+        score += min(article['score'] / 1000, 3.0)  # Cap at 3 points
+    
+    # Add points for recency (naive timestamps are local, as Reddit's are built)
+    try:
+        created_at = datetime.fromisoformat(article['created_at'].replace('Z', '+00:00'))
+        hours_old = (datetime.now(created_at.tzinfo) - created_at).total_seconds() / 3600
+        if hours_old < 24:
+            score += 2.0
+        elif hours_old < 48:
+            score += 1.0
+    except Exception:
+        pass
+    
+    # Normalize score to 0-10 range
+    return min(max(score, 0.0), 10.0)
+
+def _keyword_counts(titles: Sequence[Optional[str]]) -> np.ndarray:
+    """Count distinct weird keywords per title with one substring scan per keyword over all titles."""
+    lowered = [(title or '').lower() for title in titles]
+    # Keywords never contain the separator, so no match can straddle two titles
+    text = '\n'.join(lowered)
+    starts = np.cumsum([0] + [len(title) + 1 for title in lowered[:-1]])
+    
+    hits = np.zeros((len(lowered), len(WEIRD_KEYWORDS)), dtype=bool)
+    for k, keyword in enumerate(WEIRD_KEYWORDS):
+        positions = []
+        position = text.find(keyword)
+        while position != -1:
+            positions.append(position)
+            position = text.find(keyword, position + 1)
+        if positions:
+            hits[np.searchsorted(starts, positions, side='right') - 1, k] = True
+    return hits.sum(axis=1)
+
+def _epoch_seconds(timestamps: Sequence[Optional[str]]) -> np.ndarray:
+    """Parse ISO timestamps to UTC epoch seconds in bulk; unparseable ones become NaN.
+    
+    Naive timestamps are local time. A trailing 'Z' or '+HH:MM' offset is
+    stripped and applied with array arithmetic on the strings' code points,
+    so no per-timestamp Python parsing is needed.
+    """
+    raw = np.array([ts if isinstance(ts, str) else '' for ts in timestamps], dtype='U40')
+    count = len(raw)
+    if count == 0:
+        return np.zeros(0)
+    
+    chars = raw.view(np.uint32).reshape(count, -1)  # Writes through to `raw`
+    rows = np.arange(count)
+    lengths = (chars != 0).sum(axis=1)
+    
+    def char_at(index):
+        return chars[rows, np.clip(index, 0, chars.shape[1] - 1)]
+    
+    is_z = (lengths > 0) & (char_at(lengths - 1) == ord('Z'))
+    has_offset = (~is_z & (lengths >= 6)
+                  & np.isin(char_at(lengths - 6), (ord('+'), ord('-')))
+                  & (char_at(lengths - 3) == ord(':')))
+    
+    offsets = np.zeros(count)
+    if has_offset.any():
+        idx, ends = rows[has_offset], lengths[has_offset]
+        digit = lambda position: chars[idx, position].astype(int) - ord('0')
+        sign = np.where(chars[idx, ends - 6] == ord('-'), -1, 1)
+        offsets[idx] = sign * ((digit(ends - 5) * 10 + digit(ends - 4)) * 3600
+                               + (digit(ends - 2) * 10 + digit(ends - 1)) * 60)
+        chars[idx[:, None], (ends - 6)[:, None] + np.arange(6)] = 0
+    chars[rows[is_z], lengths[is_z] - 1] = 0
+    
+    try:
+        parsed = raw.astype('datetime64[s]')
+    except ValueError:
+        parsed = np.array([_parse_datetime64(ts) for ts in raw], dtype='datetime64[s]')
+    
+    # datetime64 reads every string as UTC; undo explicit offsets and the local offset of naive ones
+    local_offset = datetime.now().astimezone().utcoffset().total_seconds()
+    seconds = parsed.astype('int64').astype(float) - np.where(is_z | has_offset, offsets, local_offset)
+    seconds[np.isnat(parsed)] = np.nan
+    return seconds
+
+def _parse_datetime64(ts: str):
+    try:
+        return np.datetime64(ts, 's') if ts else np.datetime64('NaT')
+    except ValueError:
+        return np.datetime64('NaT')
+
+def local_weirdness_scores(articles: Union[List[Dict], Dict[str, Sequence]]) -> np.ndarray:
+    """Batch version of local_weirdness_score over a list of articles or a columnar batch.
+    
+    A columnar batch is a dict of equal-length 'title', 'score' and 'created_at'
+    sequences; 'score' and 'created_at' may be omitted.
+    """
+    if isinstance(articles, dict):
+        titles = articles['title']
+        engagement = articles.get('score')
+        created_at = articles.get('created_at')
+    else:
+        titles = [article.get('title') for article in articles]
+        engagement = [article.get('score') for article in articles]
+        created_at = [article.get('created_at') for article in articles]
+    
+    # Two points per distinct weird keyword in the title
+    score = _keyword_counts(titles) * 2.0
+    
+    # Engagement, capped at 3 points
+    if engagement is not None:
+        engagement = np.array([value or 0 for value in engagement], dtype=float)
+        score += np.minimum(engagement / 1000, 3.0)
+    
+    # Recency: 2 points under a day old, 1 point under two days
+    if created_at is not None:
+        hours_old = (time.time() - _epoch_seconds(created_at)) / 3600  # NaN never compares true
+        score += np.where(hours_old < 24, 2.0, np.where(hours_old < 48, 1.0, 0.0))
+    
+    # Normalize score to 0-10 range
+    return np.clip(score, 0.0, 10.0)
 
 class NewsScraper:
     def __init__(self):
         self.base_dir = os.path.expanduser("~/weird_news_pipeline")
-        self.cache_dir = os.path.join(self.base_dir, "cache")
-        os.makedirs(self.cache_dir, exist_ok=True)
+        os.makedirs(self.base_dir, exist_ok=True)
+        
+        # Indexed history of every scored article
+        self.store = ArticleStore()
         
         # Sources configuration
         self.sources = {
@@ -28,144 +165,176 @@ class NewsScraper:
                 'keywords': ['weird', 'strange', 'unusual', 'bizarre', 'odd']
             }
         }
-
-    async def fetch_reddit_articles(self) -> List[Dict]:
-        """Fetch articles from specified subreddits."""
-        articles = []
         
-        async with aiohttp.ClientSession() as session:
-            for subreddit in self.sources['reddit']['subreddits']:
-                url = self.sources['reddit']['url'].format(subreddit)
-                headers = self.sources['reddit']['headers']
-                
-                try:
-                    async with session.get(url, headers=headers) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            for post in data['data']['children']:
-                                post_data = post['data']
-                                articles.append({
-                                    'id': post_data['id'],
-                                    'title': post_data['title'],
-                                    'url': post_data['url'],
-                                    'source': f'reddit/{subreddit}',
-                                    'created_at': datetime.fromtimestamp(post_data['created_utc']).isoformat(),
-                                    'score': post_data['score']
-                                })
-                except Exception as e:
-                    print(f"Error fetching from r/{subreddit}: {str(e)}")
-                
-                # Respect rate limits
-                await asyncio.sleep(2)
+        # Per-host token buckets, sized from RATE_LIMIT_REQUESTS/RATE_LIMIT_PERIOD
+        self.rate_limiter = HostRateLimiter()
         
-        return articles
+        # Cursors and seen IDs so each run only pulls what is new
+        self.state = IngestState()
+        
+        # Collapses the same story arriving via several keywords/subreddits
+        self.deduplicator = Deduplicator()
 
-    async def fetch_newsapi_articles(self) -> List[Dict]:
-        """Fetch articles from NewsAPI."""
+    async def fetch_reddit_articles(self, session: Optional[aiohttp.ClientSession] = None) -> List[Dict]:
+        """Fetch articles from specified subreddits concurrently."""
+        if session is None:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)) as session:
+                return await self.fetch_reddit_articles(session)
+        
+        results = await asyncio.gather(*(
+            self._fetch_subreddit(session, subreddit)
+            for subreddit in self.sources['reddit']['subreddits']
+        ))
+        return [article for articles in results for article in articles]
+
+    async def _fetch_subreddit(self, session: aiohttp.ClientSession, subreddit: str) -> List[Dict]:
+        """Fetch posts newer than the stored cursor from a single subreddit."""
         articles = []
+        source = f'reddit/{subreddit}'
+        url = self.sources['reddit']['url'].format(subreddit)
+        headers = {
+            **self.sources['reddit']['headers'],
+            **self.state.conditional_headers(source, url)
+        }
+        params = {'limit': 100}
         
-        if not self.sources['newsapi']['api_key']:
-            print("NewsAPI key not configured")
-            return articles
-        
-        async with aiohttp.ClientSession() as session:
-            for keyword in self.sources['newsapi']['keywords']:
-                params = {
-                    'q': keyword,
-                    'apiKey': self.sources['newsapi']['api_key'],
-                    'language': 'en',
-                    'sortBy': 'publishedAt'
-                }
-                
-                try:
-                    async with session.get(self.sources['newsapi']['url'], params=params) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            for article in data.get('articles', []):
-                                articles.append({
-                                    'id': hash(article['url']),  # Create unique ID from URL
-                                    'title': article['title'],
-                                    'description': article.get('description', ''),
-                                    'url': article['url'],
-                                    'source': f"newsapi/{article['source']['name']}",
-                                    'created_at': article['publishedAt']
-                                })
-                except Exception as e:
-                    print(f"Error fetching from NewsAPI with keyword '{keyword}': {str(e)}")
-                
-                # Respect rate limits
-                await asyncio.sleep(1)
+        # `before` pages towards newer posts; a cursor whose post may have been
+        # removed is dropped after CURSOR_MAX_AGE and the seen set takes over
+        cursor = self.state.get_cursor(source, 'before')
+        if cursor and time.time() - cursor['created_utc'] < CURSOR_MAX_AGE:
+            params['before'] = cursor['name']
+        
+        try:
+            # Respect rate limits
+            await self.rate_limiter.acquire(url)
+            async with session.get(url, headers=headers, params=params) as response:
+                if response.status == 304:
+                    return articles
+                if response.status == 200:
+                    self.state.remember_validators(source, url, response.headers)
+                    data = await response.json()
+                    posts = [post['data'] for post in data['data']['children']]
+                    if posts:
+                        newest = max(posts, key=lambda post_data: post_data['created_utc'])
+                        self.state.set_cursor(source, 'before', {
+                            'name': newest['name'],
+                            'created_utc': newest['created_utc']
+                        })
+                    for post_data in posts:
+                        articles.append({
+                            'id': post_data['id'],
+                            'title': post_data['title'],
+                            'url': post_data['url'],
+                            'source': source,
+                            'created_at': datetime.fromtimestamp(post_data['created_utc']).isoformat(),
+                            'score': post_data['score']
+                        })
+        except Exception as e:
+            print(f"Error fetching from r/{subreddit}: {str(e)}")
         
+        articles = self.state.unseen(source, articles)
+        self.state.mark_seen(source, (article['id'] for article in articles))
         return articles
 
-    def calculate_weirdness_score(self, article: Dict) -> float:
-        """Calculate a weirdness score for an article based on various factors."""
-        score = 0.0
+    async def fetch_newsapi_articles(self, session: Optional[aiohttp.ClientSession] = None) -> List[Dict]:
+        """Fetch articles from NewsAPI, one request per keyword, concurrently."""
+        if not self.sources['newsapi']['api_key']:
+            print("NewsAPI key not configured")
+            return []
         
-        # Check title for weird keywords
-        weird_keywords = ['bizarre', 'strange', 'unusual', 'mysterious', 'unexpected', 
-                         'surprising', 'odd', 'weird', 'incredible', 'unbelievable']
-        title_lower = article['title'].lower()
+        if session is None:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)) as session:
+                return await self.fetch_newsapi_articles(session)
         
-        # Add points for each weird keyword
-        score += sum(2.0 for keyword in weird_keywords if keyword in title_lower)
+        results = await asyncio.gather(*(
+            self._fetch_newsapi_keyword(session, keyword)
+            for keyword in self.sources['newsapi']['keywords']
+        ))
+        return [article for articles in results for article in articles]
+
+    async def _fetch_newsapi_keyword(self, session: aiohttp.ClientSession, keyword: str) -> List[Dict]:
+        """Fetch NewsAPI results for a single keyword published since the last run."""
+        articles = []
+        params = {
+            'q': keyword,
+            'apiKey': self.sources['newsapi']['api_key'],
+            'language': 'en',
+            'sortBy': 'publishedAt'
+        }
         
-        # Add points for engagement (if available)
-        if 'score' in article:
-            score += min(article['score'] / 1000, 3.0)  # Cap at 3 points
+        # `from` is inclusive, so the boundary article comes back and is dropped as seen
+        published_since = self.state.get_cursor('newsapi', f'from:{keyword}')
+        if published_since:
+            params['from'] = published_since
         
-        # Add points for recency
         try:
-            created_at = datetime.fromisoformat(article['created_at'].replace('Z', '+00:00'))
-            hours_old = (datetime.now() - created_at).total_seconds() / 3600
-            if hours_old < 24:
-                score += 2.0
-            elif hours_old < 48:
-                score += 1.0
-        except Exception:
-            pass
-        
-        # Normalize score to 0-10 range
-        return min(max(score, 0.0), 10.0)
+            # Respect rate limits
+            await self.rate_limiter.acquire(self.sources['newsapi']['url'])
+            async with session.get(self.sources['newsapi']['url'], params=params) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    results = data.get('articles', [])
+                    if results:
+                        self.state.set_cursor('newsapi', f'from:{keyword}',
+                                              max(article['publishedAt'] for article in results))
+                    for article in results:
+                        articles.append({
+                            'id': content_id(article['url']),  # Stable ID from canonical URL
+                            'title': article['title'],
+                            'description': article.get('description', ''),
+                            'url': article['url'],
+                            'source': f"newsapi/{article['source']['name']}",
+                            'created_at': article['publishedAt']
+                        })
+        except Exception as e:
+            print(f"Error fetching from NewsAPI with keyword '{keyword}': {str(e)}")
+        
+        articles = self.state.unseen('newsapi', articles, key=lambda article: article['url'])
+        self.state.mark_seen('newsapi', (article['url'] for article in articles))
+        return articles
+
+    def calculate_weirdness_score(self, article: Dict) -> float:
+        """Calculate a weirdness score for an article based on various factors."""
+        return local_weirdness_score(article)
 
     async def fetch_all_articles(self) -> List[Dict]:
-        """Fetch articles from all sources and calculate weirdness scores."""
-        # Fetch from all sources concurrently
-        reddit_articles = await self.fetch_reddit_articles()
-        newsapi_articles = await self.fetch_newsapi_articles()
+        """Fetch new articles from all sources and calculate weirdness scores."""
+        # Fetch from all sources concurrently over one shared session
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)) as session:
+            reddit_articles, newsapi_articles = await asyncio.gather(
+                self.fetch_reddit_articles(session),
+                self.fetch_newsapi_articles(session)
+            )
+            
+            # Combine articles, dropping cross-source duplicates
+            all_articles = await self.deduplicator.dedupe(reddit_articles + newsapi_articles, session)
         
-        # Combine articles and calculate scores
-        all_articles = reddit_articles + newsapi_articles
-        for article in all_articles:
-            article['weirdness_score'] = self.calculate_weirdness_score(article)
+        # Calculate scores
+        for article, score in zip(all_articles, local_weirdness_scores(all_articles)):
+            article['weirdness_score'] = float(score)
         
         # Sort by weirdness score
         all_articles.sort(key=lambda x: x['weirdness_score'], reverse=True)
         
-        # Cache the results
-        cache_path = os.path.join(self.cache_dir, f"articles_{int(time.time())}.json")
-        with open(cache_path, 'w') as f:
-            json.dump(all_articles, f, indent=2)
+        # Store the results and apply retention
+        if all_articles:
+            self.store.upsert_articles(all_articles)
+            self.store.prune()
+        else:
+            print("No new articles since the last run")
+        
+        # Only advance cursors once the batch has been handled
+        self.state.save()
         
         return all_articles
 
     def get_weirdest_article(self) -> Dict:
-        """Get the weirdest article from the most recent cache."""
-        # Find the most recent cache file
-        cache_files = [f for f in os.listdir(self.cache_dir) if f.startswith('articles_')]
-        if not cache_files:
-            raise Exception("No cached articles found")
-        
-        latest_cache = max(cache_files)
-        cache_path = os.path.join(self.cache_dir, latest_cache)
-        
-        with open(cache_path, 'r') as f:
-            articles = json.load(f)
-        
-        if not articles:
-            raise Exception("No articles found in cache")
+        """Get the weirdest article fetched within the last WEIRDEST_WINDOW_HOURS."""
+        article = self.store.top(since=time.time() - WEIRDEST_WINDOW_HOURS * 3600)
+        if not article:
+            raise Exception("No recent articles found in store")
         
-        return articles[0]  # Return the article with highest weirdness score
+        return article
 
 async def main():
     """Test the NewsScraper functionality."""
@@ -0,0 +1,97 @@
+import time
+from typing import Dict, Optional
+from config import ROUTING_EWMA_ALPHA, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT
+
+class CircuitOpenError(Exception):
+    """A provider's half-open circuit is already running its one trial call."""
+
+class ProviderHealth:
+    def __init__(self, alpha: float = ROUTING_EWMA_ALPHA,
+                 failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        """Latency and error-rate EWMAs for one provider, plus a circuit breaker."""
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latency: Optional[float] = None  # EWMA of successful call seconds
+        # The same EWMA per pipeline stage, since a one-number score and a whole script differ ~10x
+        self.stage_latency: Dict[str, float] = {}
+        self.error_rate = 0.0  # EWMA of failures, 0 (never fails) to 1 (always fails)
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False  # Half-open lets exactly one trial call through
+        self.successes = 0
+        self.failures = 0
+
+    def _smooth(self, current: Optional[float], sample: float) -> float:
+        return sample if current is None else self.alpha * sample + (1 - self.alpha) * current
+
+    @property
+    def state(self) -> str:
+        """'closed' (healthy), 'open' (skipped) or 'half_open' (next call is a trial)."""
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return 'open'
+        return 'half_open'
+
+    def available(self) -> bool:
+        state = self.state
+        return state == 'closed' or (state == 'half_open' and not self._probe_in_flight)
+
+    def begin_call(self) -> bool:
+        """Claim a call; True if it is the half-open trial, which the caller must record the result of.
+        
+        Raises CircuitOpenError while another trial is in flight. Calls to an
+        open circuit are let through untouched (routing already skips it unless
+        every provider is open).
+        """
+        if self.state != 'half_open':
+            return False
+        if self._probe_in_flight:
+            raise CircuitOpenError("Circuit half-open and its trial call is still in flight")
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self, latency: float, stage: Optional[str] = None):
+        self.latency = self._smooth(self.latency, latency)
+        if stage is not None:
+            self.stage_latency[stage] = self._smooth(self.stage_latency.get(stage), latency)
+        self.error_rate = self._smooth(self.error_rate, 0.0)
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+        self.successes += 1
+
+    def record_failure(self):
+        self.error_rate = self._smooth(self.error_rate, 1.0)
+        self.consecutive_failures += 1
+        self.failures += 1
+        # A failed trial call re-opens the circuit straight away
+        if self.consecutive_failures >= self.failure_threshold or self.state == 'half_open':
+            self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def record_abandoned(self, elapsed: float, probe: bool = False, stage: Optional[str] = None):
+        """A call cancelled after `elapsed` seconds (e.g. lost a hedge) took at least that long.
+        
+        An abandoned trial gave no verdict, so the next call may try again.
+        """
+        if self.latency is not None and elapsed > self.latency:
+            self.latency = self._smooth(self.latency, elapsed)
+        current = self.stage_latency.get(stage)
+        if current is not None and elapsed > current:
+            self.stage_latency[stage] = self._smooth(current, elapsed)
+        if probe:
+            self._probe_in_flight = False
+
+    def snapshot(self) -> Dict:
+        return {
+            'state': self.state,
+            'latency_ewma': round(self.latency, 3) if self.latency is not None else None,
+            'stage_latency_ewma': {stage: round(latency, 3) for stage, latency in self.stage_latency.items()},
+            'error_rate': round(self.error_rate, 3),
+            'consecutive_failures': self.consecutive_failures,
+            'successes': self.successes,
+            'failures': self.failures
+        }
@@ -0,0 +1,109 @@
+import time
+import asyncio
+from collections import deque
+from typing import Dict, Optional
+from urllib.parse import urlparse
+from config import RATE_LIMIT_REQUESTS, RATE_LIMIT_PERIOD
+
+class TokenBucket:
+    def __init__(self, capacity: int = RATE_LIMIT_REQUESTS, period: float = RATE_LIMIT_PERIOD):
+        """Allow bursts of up to `capacity` requests, refilling at capacity/period per second."""
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        # Created lazily so the lock binds to the loop that actually uses it
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        # The lock queues waiters in FIFO order; only the head sleeps on the refill
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class HostRateLimiter:
+    def __init__(self, capacity: int = RATE_LIMIT_REQUESTS, period: float = RATE_LIMIT_PERIOD,
+                 overrides: Optional[Dict[str, tuple]] = None):
+        """Keep one token bucket per host so a busy API never throttles another."""
+        self.capacity = capacity
+        self.period = period
+        self.overrides = overrides or {}
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    def bucket_for(self, host: str) -> TokenBucket:
+        if host not in self.buckets:
+            capacity, period = self.overrides.get(host, (self.capacity, self.period))
+            self.buckets[host] = TokenBucket(capacity, period)
+        return self.buckets[host]
+
+    async def acquire(self, url: str):
+        """Wait for a request slot on the host of the given URL."""
+        await self.bucket_for(urlparse(url).netloc).acquire()
+
+class SlidingWindowLimiter:
+    def __init__(self, max_requests: int, max_tokens: Optional[int] = None, period: float = RATE_LIMIT_PERIOD):
+        """Enforce request and token budgets over a sliding window, serving waiters in FIFO order."""
+        self.max_requests = max_requests
+        self.max_tokens = max_tokens
+        self.period = period
+        self.events = deque()  # (timestamp, tokens) of requests still inside the window
+        self.tokens_in_window = 0
+        self.waiters = deque()  # Futures; only the head checks the window, the rest wait their turn
+
+    def _expire(self, now: float):
+        while self.events and self.events[0][0] <= now - self.period:
+            self.tokens_in_window -= self.events.popleft()[1]
+
+    def _wait_time(self, tokens: int, now: float) -> float:
+        """Seconds until a request costing `tokens` fits in both budgets."""
+        wait = 0.0
+        if len(self.events) >= self.max_requests:
+            oldest_blocking = self.events[len(self.events) - self.max_requests][0]
+            wait = oldest_blocking + self.period - now
+        if self.max_tokens is not None:
+            excess = self.tokens_in_window + tokens - self.max_tokens
+            for timestamp, cost in self.events:
+                if excess <= 0:
+                    break
+                excess -= cost
+                wait = max(wait, timestamp + self.period - now)
+        return wait
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """Wait for a slot costing `tokens`; returns the seconds spent queued."""
+        if self.max_tokens is not None:
+            tokens = min(tokens, self.max_tokens)  # An oversized request would otherwise never fit
+        start = time.monotonic()
+        turn = asyncio.get_running_loop().create_future()
+        self.waiters.append(turn)
+        try:
+            if self.waiters[0] is not turn:
+                await turn
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                wait = self._wait_time(tokens, now)
+                if wait <= 0:
+                    self.events.append((now, tokens))
+                    self.tokens_in_window += tokens
+                    return now - start
+                # Sleep exactly until the blocking entry leaves the window
+                await asyncio.sleep(wait)
+        finally:
+            was_head = self.waiters[0] is turn
+            self.waiters.remove(turn)
+            if was_head and self.waiters and not self.waiters[0].done():
+                self.waiters[0].set_result(None)
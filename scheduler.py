@@ -1,41 +1,60 @@
 import asyncio
 import schedule
-import time
 from datetime import datetime
 from video_pipeline import VideoPipeline
+from llm_manager import shared_llm_manager
+from download_engine import shared_download_engine
 
 async def generate_daily_newsreel():
     """Generate the daily weird news video."""
     print(f"\n=== Starting Daily Newsreel Generation at {datetime.now().isoformat()} ===")
     pipeline = VideoPipeline()
     try:
-        output_path = await pipeline.generate_daily_video()
+        with shared_llm_manager().metrics.run('daily_newsreel'):
+            output_path = await pipeline.generate_daily_video()
         print(f"Daily newsreel completed successfully. Video saved to: {output_path}")
     except Exception as e:
         print(f"Error generating daily newsreel: {str(e)}")
 
-def run_scheduler():
-    """Run the scheduler to generate videos daily."""
+async def scheduler_loop():
+    """Run pending jobs on one long-lived event loop, so LLM clients stay pooled between runs."""
+    jobs = set()
+
+    def start_job():
+        job = asyncio.ensure_future(generate_daily_newsreel())
+        jobs.add(job)
+        job.add_done_callback(jobs.discard)
+
     # Schedule the job to run at 6 AM every day
-    schedule.every().day.at("06:00").do(lambda: asyncio.run(generate_daily_newsreel()))
+    schedule.every().day.at("06:00").do(start_job)
     
     # Also run it immediately when starting the scheduler
-    asyncio.run(generate_daily_newsreel())
+    await generate_daily_newsreel()
     
     print("\nScheduler is running. Will generate new videos daily at 6 AM.")
     print("Press Ctrl+C to stop.")
     
-    while True:
-        try:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
-        except KeyboardInterrupt:
-            print("\nScheduler stopped by user.")
-            break
-        except Exception as e:
-            print(f"Scheduler error: {str(e)}")
-            # Wait a bit before retrying
-            time.sleep(300)
+    try:
+        while True:
+            try:
+                schedule.run_pending()
+                await asyncio.sleep(60)  # Check every minute
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Scheduler error: {str(e)}")
+                # Wait a bit before retrying
+                await asyncio.sleep(300)
+    finally:
+        await shared_llm_manager().close()
+        await shared_download_engine().close()
+
+def run_scheduler():
+    """Run the scheduler to generate videos daily."""
+    try:
+        asyncio.run(scheduler_loop())
+    except KeyboardInterrupt:
+        print("\nScheduler stopped by user.")
 
 if __name__ == "__main__":
     run_scheduler()
@@ -1,12 +1,72 @@
 import os
+import re
 import json
+import time
 import asyncio
-from llm_manager import LLMManager
-from config import LLM_CONFIGS
+from llm_manager import shared_llm_manager
+from config import LLM_CONFIGS, SCRIPT_MAX_CONCURRENCY, SCRIPT_STYLES
+
+VISUAL_CUE_RE = re.compile(r'\[VISUAL:\s*([^\]]*)\]')
+# A sentence ends at .!? followed by whitespace and a capitalised word (possibly quoted or a cue)
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+(?=["\'(\[]*[A-Z])|\n+')
+# Titles and initials (but not "I") whose period doesn't end a sentence: "Dr. Smith", "J. Edgar Hoover"
+ABBREVIATION_RE = re.compile(r'(?:\b(?:Mr|Mrs|Ms|Dr|Prof|St|Jr|Sr|Mt|Gen|Gov|Sen|Rep|Capt|Col|Lt|Sgt|Rev|vs)|\b[A-HJ-Z])\.$')
+
+class ScriptSegmenter:
+    """Turn streamed script text into completed sentences and [VISUAL: ...] cues.
+    
+    Cues are emitted as soon as their closing bracket arrives; a sentence is
+    emitted once the text after it starts (or at close()), with its cues removed.
+    """
+    def __init__(self, section="main_content"):
+        self.section = section
+        self.buffer = ""
+        self.sentence = ""
+
+    def _event(self, kind, text):
+        return {"type": kind, "section": self.section, "text": text.strip()}
+
+    def _next_boundary(self):
+        for match in SENTENCE_END_RE.finditer(self.buffer):
+            # Don't split inside a bracketed cue such as [VISUAL: Mr. Smith waves]
+            before = self.buffer[:match.start()]
+            if before.count('[') > before.count(']'):
+                continue
+            if '\n' not in match.group() and ABBREVIATION_RE.search(before):
+                continue
+            return match
+        return None
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        events = []
+        while True:
+            cue = VISUAL_CUE_RE.search(self.buffer)
+            boundary = self._next_boundary()
+            if cue and (not boundary or cue.start() < boundary.start()):
+                self.sentence += self.buffer[:cue.start()]
+                events.append(self._event("visual", cue.group(1)))
+                self.buffer = self.buffer[cue.end():]
+            elif boundary:
+                self.sentence += self.buffer[:boundary.start()]
+                if self.sentence.strip():
+                    events.append(self._event("sentence", self.sentence))
+                self.sentence = ""
+                self.buffer = self.buffer[boundary.end():]
+            else:
+                return events
+
+    def close(self):
+        events = self.feed("\n")
+        remainder = self.sentence + self.buffer
+        if remainder.strip():
+            events.append(self._event("sentence", remainder))
+        self.sentence = self.buffer = ""
+        return events
 
 class ScriptGenerator:
-    def __init__(self):
-        self.llm_manager = LLMManager()
+    def __init__(self, llm_manager=None):
+        self.llm_manager = llm_manager or shared_llm_manager()
         self.system_prompt = """You are a vintage newsreel announcer from the 1940s, writing scripts for weird news stories.
 Your style should capture the dramatic, theatrical tone of classic movie newsreels:
 1. Use authoritative, bombastic language
@@ -49,10 +109,7 @@ Examples:
 
 Make it dramatic and attention-grabbing in the style of old movie newsreels."""
 
-        try:
-            hook = await self.llm_manager.generate_response(hook_prompt, 'gpt4')
-        except Exception:
-            hook = await self.llm_manager.generate_response(hook_prompt, 'claude')
+        hook = await self.llm_manager.generate_hedged(hook_prompt)
         return hook.strip()
 
     async def generate_cta(self, style="1940s newsreel"):
@@ -85,17 +142,142 @@ Examples:
 
 Make it sound like a classic newsreel sign-off while encouraging modern engagement."""
         
+        cta = await self.llm_manager.generate_hedged(cta_prompt)
+        return cta.strip()
+
+    def script_stages(self, article, style="1940s newsreel", on_segment=None):
+        """The script's stages as {name: (dependencies, coroutine function)}.
+        
+        Each function receives its dependencies' results in order. Stages
+        without dependencies on each other run concurrently, so new independent
+        sections (titles, descriptions, ...) only need an entry here.
+        """
+        if on_segment:
+            main_content = lambda hook: self.stream_main_content(article, hook, style, on_segment)
+        else:
+            main_content = lambda hook: self.generate_main_content(article, hook, style)
+        return {
+            'hook': ((), lambda: self.generate_hook(article, style)),
+            'main_content': (('hook',), main_content),
+            'cta': ((), lambda: self.generate_cta(style))
+        }
+
+    async def run_stages(self, stages, on_segment=None):
+        """Run a stage graph, each stage as soon as its dependencies finish.
+        
+        Returns (results, timings); a stage's timing excludes time spent
+        waiting on its dependencies. If given, on_segment is awaited with a
+        {"type": "section", ...} event as each stage completes.
+        """
+        tasks = {}
+        timings = {}
+        
+        async def run(name):
+            dependencies, stage = stages[name]
+            inputs = [await tasks[dependency] for dependency in dependencies]
+            start = time.monotonic()
+            with self.llm_manager.metrics.stage(name):
+                result = await stage(*inputs)
+            timings[name] = round(time.monotonic() - start, 3)
+            if on_segment:
+                await on_segment({"type": "section", "section": name, "text": result})
+            return result
+        
+        start = time.monotonic()
+        for name in stages:
+            tasks[name] = asyncio.ensure_future(run(name))
         try:
-            cta = await self.llm_manager.generate_response(cta_prompt, 'gpt4')
+            results = await asyncio.gather(*tasks.values())
         except Exception:
-            cta = await self.llm_manager.generate_response(cta_prompt, 'claude')
-        return cta.strip()
+            for task in tasks.values():
+                task.cancel()
+            raise
+        timings['total'] = round(time.monotonic() - start, 3)
+        return dict(zip(tasks, results)), timings
+
+    async def generate_script(self, article, style="1940s newsreel", on_segment=None):
+        """Generate a complete newsreel-style script.
+        
+        Pass an async on_segment callback to receive the script while it is
+        being written: each finished section, and the main content's completed
+        sentences and [VISUAL: ...] cues as they stream in.
+        """
+        # The CTA doesn't depend on the story, so it runs alongside hook -> main content
+        stages = self.script_stages(article, style, on_segment)
+        sections, timings = await self.run_stages(stages, on_segment)
+        hook = sections['hook']
+        main_script = sections['main_content']
+        cta = sections['cta']
+        
+        # Combine all parts and format
+        provider_order = self.llm_manager.provider_order()
+        full_script = {
+            "metadata": {
+                "source_article": article['url'],
+                "weirdness_score": article.get('weirdness_score', 0),
+                "timestamp": article.get('created_at', ''),
+                "style": style,
+                "models_used": {
+                    "primary": provider_order[0],
+                    "fallback": provider_order[1:]
+                },
+                "stage_timings": timings
+            },
+            "script_sections": {
+                "hook": hook,
+                "main_content": main_script,
+                "cta": cta
+            },
+            "audio_notes": {
+                "voice_style": "Authoritative, theatrical newsreel announcer",
+                "pacing": "Quick and punchy with dramatic pauses",
+                "music": "Period-appropriate orchestral and brass"
+            },
+            "visual_notes": {
+                "style": "Black and white, vintage newsreel footage",
+                "transitions": "Classic film reel transitions",
+                "effects": "Grain overlay, slight flicker effect"
+            },
+            "estimated_duration": "30-60 seconds"
+        }
+        
+        return full_script
 
-    async def generate_script(self, article, style="1940s newsreel"):
-        """Generate a complete newsreel-style script."""
-        # Generate hook first
-        hook = await self.generate_hook(article, style)
+    async def generate_main_content(self, article, hook, style="1940s newsreel"):
+        """Generate the story body of the script, opening with the given hook."""
+        # Generate main script, hedging to the next provider if the first one is slow or fails
+        main_script = await self.llm_manager.generate_hedged(self.main_content_prompt(article, hook, style))
+        return main_script
+
+    async def stream_main_content(self, article, hook, style="1940s newsreel", on_segment=None):
+        """Generate the story body from a hedged stream, handing each completed
+        sentence and visual cue to on_segment as it arrives.
         
+        If the stream fails, the hedged non-streaming path takes over and its
+        text is segmented from the start, so segments may repeat.
+        """
+        script_prompt = self.main_content_prompt(article, hook, style)
+        segmenter = ScriptSegmenter("main_content")
+        chunks = []
+        try:
+            # A provider slow to start streaming is hedged, like the non-streaming calls
+            async for chunk in self.llm_manager.stream_hedged(script_prompt):
+                chunks.append(chunk)
+                for event in segmenter.feed(chunk):
+                    await on_segment(event)
+            main_script = "".join(chunks).strip()
+        except Exception as e:
+            print(f"Streaming main content failed, falling back: {str(e)}")
+            main_script = await self.llm_manager.generate_hedged(script_prompt)
+            segmenter = ScriptSegmenter("main_content")
+            for event in segmenter.feed(main_script):
+                await on_segment(event)
+        for event in segmenter.close():
+            await on_segment(event)
+        return main_script
+
+    def main_content_prompt(self, article, hook, style="1940s newsreel"):
+        """Build the main-script prompt for the given style."""
         if style == "1940s newsreel":
             script_prompt = f"""Transform this weird news story into a 1940s-style newsreel script:
 
@@ -186,49 +368,37 @@ Citizens of Milwaukee witness what can only be described as... [EMPHASIS] the mo
 [VISUAL: panning shot of confused onlookers]"
 """
 
-        # Generate main script with fallback options
-        try:
-            main_script = await self.llm_manager.generate_response(script_prompt, 'gpt4')
-        except Exception:
-            try:
-                main_script = await self.llm_manager.generate_response(script_prompt, 'claude')
-            except Exception:
-                main_script = await self.llm_manager.generate_response(script_prompt, 'gemini')
+        return script_prompt
+
+    async def generate_scripts(self, articles, styles=None, max_concurrency=SCRIPT_MAX_CONCURRENCY):
+        """Generate a script for every article x style pair, yielding each as it completes.
         
-        # Generate CTA
-        cta = await self.generate_cta(style)
+        Yields {"article", "style", "script", "error"} dicts; a failed pair has
+        script None and the error message, and doesn't stop the others. At most
+        max_concurrency scripts are in progress; the LLMManager rate limits
+        apply across all of them, and identical prompts (e.g. a style's CTA)
+        are only sent once.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
         
-        # Combine all parts and format
-        full_script = {
-            "metadata": {
-                "source_article": article['url'],
-                "weirdness_score": article.get('weirdness_score', 0),
-                "timestamp": article.get('created_at', ''),
-                "style": style,
-                "models_used": {
-                    "primary": "gpt4",
-                    "fallback": ["claude", "gemini"]
-                }
-            },
-            "script_sections": {
-                "hook": hook,
-                "main_content": main_script,
-                "cta": cta
-            },
-            "audio_notes": {
-                "voice_style": "Authoritative, theatrical newsreel announcer",
-                "pacing": "Quick and punchy with dramatic pauses",
-                "music": "Period-appropriate orchestral and brass"
-            },
-            "visual_notes": {
-                "style": "Black and white, vintage newsreel footage",
-                "transitions": "Classic film reel transitions",
-                "effects": "Grain overlay, slight flicker effect"
-            },
-            "estimated_duration": "30-60 seconds"
-        }
+        async def generate(article, style):
+            async with semaphore:
+                try:
+                    script = await self.generate_script(article, style)
+                    return {"article": article, "style": style, "script": script, "error": None}
+                except Exception as e:
+                    print(f"Error generating {style} script for {article.get('title')}: {str(e)}")
+                    return {"article": article, "style": style, "script": None, "error": str(e)}
         
-        return full_script
+        tasks = [asyncio.ensure_future(generate(article, style))
+                 for article in articles for style in (styles or SCRIPT_STYLES)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The caller stopped early; don't leave scripts generating in the background
+            for task in tasks:
+                task.cancel()
 
     def save_script(self, script, filename):
         """Save the generated script to a JSON file."""
@@ -251,20 +421,17 @@ async def main():
     }
     
     generator = ScriptGenerator()
+    filenames = {"1940s newsreel": "test_script_1940s.json", "comedic": "test_script_comedic.json"}
     
-    # Generate 1940s newsreel script
-    script1 = await generator.generate_script(sample_article, style="1940s newsreel")
-    filepath1 = generator.save_script(script1, "test_script_1940s.json")
-    print(f"Script generated and saved to: {filepath1}")
-    print("\nGenerated Script:")
-    print(json.dumps(script1, indent=2))
-    
-    # Generate comedic script
-    script2 = await generator.generate_script(sample_article, style="comedic")
-    filepath2 = generator.save_script(script2, "test_script_comedic.json")
-    print(f"Script generated and saved to: {filepath2}")
-    print("\nGenerated Script:")
-    print(json.dumps(script2, indent=2))
+    # Generate both styles concurrently, saving each as soon as it is ready
+    async for result in generator.generate_scripts([sample_article], list(filenames)):
+        if result['error']:
+            print(f"Failed to generate {result['style']} script: {result['error']}")
+            continue
+        filepath = generator.save_script(result['script'], filenames[result['style']])
+        print(f"Script generated and saved to: {filepath}")
+        print("\nGenerated Script:")
+        print(json.dumps(result['script'], indent=2))
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,41 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable
+
+class SingleFlight:
+    def __init__(self):
+        """Share one in-flight task among concurrent callers with the same key."""
+        self.in_flight: Dict[Hashable, Dict] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.in_flight
+
+    def _flight(self, key: Hashable, make_task: Callable[[], Awaitable], detached: bool) -> Dict:
+        flight = self.in_flight.get(key)
+        if flight is None:
+            flight = {'task': asyncio.ensure_future(make_task()), 'waiters': 0, 'detached': detached}
+            self.in_flight[key] = flight
+            flight['task'].add_done_callback(lambda _: self.in_flight.pop(key, None))
+        return flight
+
+    def start(self, key: Hashable, make_task: Callable[[], Awaitable]) -> asyncio.Future:
+        """Start a task for key in the background unless one is running; it is never
+        cancelled by waiters leaving."""
+        return self._flight(key, make_task, detached=True)['task']
+
+    async def run(self, key: Hashable, make_task: Callable[[], Awaitable]):
+        """Join the running task for key, or start one, and return its result.
+
+        Every waiter gets the same result or exception. A waiter that is
+        cancelled leaves the shared task running for the others; it is only
+        cancelled once no waiter is left (and never if it was start()ed).
+        """
+        flight = self._flight(key, make_task, detached=False)
+        flight['waiters'] += 1
+        try:
+            return await asyncio.shield(flight['task'])
+        except asyncio.CancelledError:
+            if flight['waiters'] == 1 and not flight['detached'] and not flight['task'].done():
+                flight['task'].cancel()
+            raise
+        finally:
+            flight['waiters'] -= 1
@@ -1,8 +1,48 @@
-import os
+import re
+import time
 import aiohttp
 import asyncio
-from typing import Dict
-from config import STOCK_FOOTAGE_CONFIGS
+from typing import Dict, List, Optional
+from config import (
+    STOCK_FOOTAGE_CONFIGS, PEXELS_SEARCH_CACHE_PATH, PEXELS_SEARCH_TTL,
+    PEXELS_SEARCH_STALE_TTL, PEXELS_SEARCH_CACHE_MAX_ENTRIES
+)
+from footage_cache import FootageCache
+from download_engine import shared_download_engine
+from disk_cache import DiskCache, content_key
+from single_flight import SingleFlight
+
+# Words that don't change what footage a search finds
+SEARCH_STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is', 'it',
+    'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'with'
+}
+QUERY_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop stop words and sort, so equivalent searches share a cache entry."""
+    tokens = set(QUERY_TOKEN_RE.findall(query.lower()))
+    return " ".join(sorted(tokens - SEARCH_STOP_WORDS)) or " ".join(sorted(tokens))
+
+def select_rendition(files: List[Dict], min_width: int, preferred_fps: float = 30) -> Optional[Dict]:
+    """Pick the smallest rendition at least min_width wide, preferring MP4 (Pexels' H.264
+    files) and then the frame rate closest to preferred_fps. If none is wide enough,
+    the widest one is used."""
+    files = [file for file in files if file.get('link') and file.get('width')]
+    if not files:
+        return None
+
+    def preference(file):
+        return (
+            file.get('file_type') != 'video/mp4',
+            file['width'] * (file.get('height') or 0),
+            abs((file.get('fps') or preferred_fps) - preferred_fps)
+        )
+
+    wide_enough = [file for file in files if file['width'] >= min_width]
+    if wide_enough:
+        return min(wide_enough, key=preference)
+    return max(files, key=lambda file: (file.get('file_type') == 'video/mp4', file['width']))
 
 class StockFootageManager:
     def __init__(self):
@@ -13,18 +53,89 @@ class StockFootageManager:
             "Content-Type": "application/json",
             "Authorization": self.config['api_key']
         }
+        self.cache = FootageCache()
+        self.downloader = shared_download_engine()
+        # Search results: fresh for PEXELS_SEARCH_TTL, then served stale while a refresh runs
+        self.search_cache = DiskCache(
+            PEXELS_SEARCH_CACHE_PATH, max_entries=PEXELS_SEARCH_CACHE_MAX_ENTRIES,
+            ttl=PEXELS_SEARCH_TTL + PEXELS_SEARCH_STALE_TTL
+        )
+        self.search_memo: Dict[str, Dict] = {}  # In-process copy of entries read this run
+        self.searches = SingleFlight()  # Searches on the wire, by cache key
 
-    async def search_videos(self, query: str) -> Dict:
-        """Search videos using Pexels API."""
-        url = f"{self.config['api_host']}/search"
-        params = {
+    def search_params(self, query: str) -> Dict:
+        return {
             "query": query,
             "per_page": self.config['per_page'],
             "min_width": self.config['min_width'],
             "min_duration": self.config['min_duration'],
             "max_duration": self.config['max_duration']
         }
+
+    async def search_videos(self, query: str) -> Dict:
+        """Search videos, answering repeat queries from the search cache.
+        
+        A fresh entry is returned as is. A stale one is returned straight
+        away while a background search refreshes it; only a missing or
+        expired entry waits for the Pexels API.
+        """
+        params = self.search_params(normalize_query(query))
+        key = content_key('pexels_search', params)
+        entry = self.search_memo.get(key) or self.search_cache.get(key)
+        if entry is not None:
+            self.search_memo[key] = entry
+            age = time.time() - entry['fetched_at']
+            if age < PEXELS_SEARCH_TTL:
+                return self.with_renditions(entry['result'])
+            if age < PEXELS_SEARCH_TTL + PEXELS_SEARCH_STALE_TTL:
+                self.searches.start(key, lambda: self._refresh_search(key, params))
+                return self.with_renditions(entry['result'])
+        
+        # Concurrent misses for one query share a single search
+        result = await self.searches.run(key, lambda: self._refresh_search(key, params))
+        if result is None:
+            raise Exception(f"Pexels search failed for '{params['query']}'")
+        return self.with_renditions(result)
+
+    def with_renditions(self, result: Dict) -> Dict:
+        """Fill in each video's download_url/rendition from its best-fitting file.
         
+        Done on every lookup rather than when caching, so a changed target
+        applies to cached searches too.
+        """
+        min_width = max(self.config['target_width'], self.config['min_width'])
+        videos = []
+        for video in result['videos']:
+            file = select_rendition(video.get('files', []), min_width, self.config['preferred_fps'])
+            if file:
+                video = {
+                    **video,
+                    'download_url': file['link'],
+                    'rendition': file.get('id', 'default'),
+                    'file_width': file['width'],
+                    'file_height': file.get('height', 0),
+                    'fps': file.get('fps')
+                }
+            videos.append(video)
+        return {**result, 'videos': videos}
+
+    async def _refresh_search(self, key: str, params: Dict) -> Optional[Dict]:
+        """Search Pexels and store the result; returns None (after logging) on failure."""
+        try:
+            result = await self.fetch_search(params)
+        except Exception as e:
+            print(f"Error searching Pexels for '{params['query']}': {str(e)}")
+            return None
+        if len(self.search_memo) >= PEXELS_SEARCH_CACHE_MAX_ENTRIES:
+            self.search_memo.clear()
+        entry = {'fetched_at': time.time(), 'result': result}
+        self.search_memo[key] = entry
+        self.search_cache.set(key, entry)
+        return result
+
+    async def fetch_search(self, params: Dict) -> Dict:
+        """Search videos using Pexels API."""
+        url = f"{self.config['api_host']}/search"
         async with aiohttp.ClientSession() as session:
             async with session.get(url, headers=self.headers, params=params) as response:
                 if response.status != 200:
@@ -36,6 +147,15 @@ class StockFootageManager:
                         "id": video["id"],
                         "url": video["url"],
                         "download_url": video.get("video_files", [{}])[0].get("link", ""),
+                        "rendition": video.get("video_files", [{}])[0].get("id", "default"),
+                        "files": [{
+                            "id": file.get("id"),
+                            "link": file.get("link"),
+                            "file_type": file.get("file_type"),
+                            "width": file.get("width"),
+                            "height": file.get("height"),
+                            "fps": file.get("fps")
+                        } for file in video.get("video_files", [])],
                         "duration": video.get("duration", 0),
                         "width": video.get("width", 0),
                         "height": video.get("height", 0),
@@ -44,22 +164,38 @@ class StockFootageManager:
                 }
 
     async def download_video(self, url: str, filepath: str) -> str:
-        """Download a video file from the given URL."""
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        """Download a video file from the given URL.
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    raise Exception(f"Failed to download video: {response.status}")
-                
-                with open(filepath, 'wb') as f:
-                    while True:
-                        chunk = await response.content.read(8192)
-                        if not chunk:
-                            break
-                        f.write(chunk)
+        The file only appears at filepath once complete and verified; an
+        interrupted download is resumed by the next call for the same path.
+        """
+        return await self.downloader.download(url, filepath)
+
+    def cached_video(self, video: Dict) -> Optional[str]:
+        """Local path of a search result's clip if it is already cached."""
+        return self.cache.get(self.cache.key(video['id'], video.get('rendition', 'default')))
+
+    async def get_video(self, video: Dict) -> str:
+        """Return a local path for a search result's clip, downloading it only on a cache miss."""
+        key = self.cache.key(video['id'], video.get('rendition', 'default'))
+        path = self.cache.get(key)
+        if path:
+            return path
         
-        return filepath
+        meta = {
+            'id': video['id'],
+            'url': video.get('url'),
+            'duration': video.get('duration', 0),
+            'width': video.get('width', 0),
+            'height': video.get('height', 0)
+        }
+        # The engine shares one transfer per temp path and holds its lock until the clip is
+        # in the cache, so another run or process wanting the same clip reuses it
+        return await self.downloader.download(
+            video['download_url'], self.cache.temp_path(key),
+            ready=lambda: self.cache.get(key),
+            finalize=lambda temp_path: self.cache.put(key, temp_path, meta)
+        )
 
 async def main():
     """Test the StockFootageManager with a sample search."""
@@ -74,9 +210,8 @@ async def main():
             # Download the first video as a test
             video = result['videos'][0]
             if video['download_url']:
-                filepath = os.path.expanduser("~/weird_news_pipeline/stock_footage/test_video.mp4")
-                await manager.download_video(video['download_url'], filepath)
-                print(f"Video downloaded to: {filepath}")
+                filepath = await manager.get_video(video)
+                print(f"Video available at: {filepath}")
             print("First video metadata:", video)
     except Exception as e:
         print(f"Error searching videos: {str(e)}")
@@ -50,8 +50,10 @@ class VideoEditor:
         """Prepare a video clip with consistent formatting."""
         clip = VideoFileClip(video_path)
         
-        # Resize to target resolution while maintaining aspect ratio
-        clip = resize(clip, width=self.target_resolution[0])
+        # Resize to target resolution while maintaining aspect ratio; renditions are
+        # usually downloaded at the target width already, which skips the per-frame resize
+        if clip.w != self.target_resolution[0]:
+            clip = resize(clip, width=self.target_resolution[0])
         
         # Trim or loop the clip to match target duration
         if clip.duration < target_duration:
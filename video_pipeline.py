@@ -1,13 +1,16 @@
 import os
+import json
 import asyncio
+import tempfile
 import time
-from typing import Dict, List
+from typing import Dict, List, Optional
 from script_generator import ScriptGenerator
 from media_manager import MediaManager
 from voice_manager import VoiceManager
 from video_editor import VideoEditor
 from news_scraper import NewsScraper
 from stock_footage_manager import StockFootageManager
+from config import FOOTAGE_DOWNLOAD_CONCURRENCY, FOOTAGE_DEADLINE
 
 class VideoPipeline:
     def __init__(self):
@@ -23,6 +26,10 @@ class VideoPipeline:
         
         for directory in [self.base_dir, self.footage_dir, self.output_dir]:
             os.makedirs(directory, exist_ok=True)
+        
+        # Completed downloads, so a section that misses its deadline can reuse one
+        self.clip_index_path = os.path.join(self.footage_dir, "clips.json")
+        self._download_semaphore = None
 
     async def fetch_todays_story(self) -> Dict:
         """Fetch today's weirdest news story."""
@@ -49,36 +56,133 @@ class VideoPipeline:
             print(f"Error generating daily video: {str(e)}")
             raise
 
-    async def find_relevant_footage(self, script: Dict) -> List[Dict]:
-        """Find relevant stock footage based on script content."""
-        video_clips = []
+    def _download_slots(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the loop that actually uses it
+        if self._download_semaphore is None:
+            self._download_semaphore = asyncio.Semaphore(FOOTAGE_DOWNLOAD_CONCURRENCY)
+        return self._download_semaphore
+
+    def _load_clip_index(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.clip_index_path):
+            return {}
+        try:
+            with open(self.clip_index_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable footage index: {str(e)}")
+            return {}
+
+    def remember_clip(self, section_name: str, clip: Dict):
+        """Record a completed download so later runs can fall back to it."""
+        # Forget clips the footage cache has since evicted
+        index = {path: entry for path, entry in self._load_clip_index().items()
+                 if os.path.exists(os.path.join(self.footage_dir, path))}
+        index[clip['path']] = {
+            'section': section_name,
+            'duration': clip['duration'],
+            'downloaded_at': time.time()
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.footage_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self.clip_index_path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def cached_clip(self, section_name: str) -> Optional[Dict]:
+        """The newest previously downloaded clip for this section, else the newest of any section."""
+        clips = []
+        for filename, entry in self._load_clip_index().items():
+            # Entries are absolute cache paths; older ones are names inside footage_dir
+            path = os.path.join(self.footage_dir, filename)
+            if os.path.exists(path):
+                clips.append((entry['section'] == section_name, entry['downloaded_at'], path, entry))
+        if not clips:
+            return None
+        _, _, path, entry = max(clips, key=lambda clip: clip[:2])
+        return {'path': path, 'duration': entry['duration']}
+
+    async def find_section_footage(self, section_name: str, content: str) -> Optional[Dict]:
+        """Search and download one clip for a piece of script content."""
+        # Extract keywords from the content
+        keywords = self._extract_keywords(content)
+        
+        # Search for videos using the keywords
+        result = await self.stock_footage.search_videos(" ".join(keywords))
         
-        # Search for footage for each script section
-        for section_name, content in script['script_sections'].items():
-            # Extract keywords from the content
-            keywords = self._extract_keywords(content)
+        if result['videos']:
+            video = result['videos'][0]  # Get the first matching video
             
-            # Search for videos using the keywords
-            result = await self.stock_footage.search_videos(" ".join(keywords))
+            # A clip used by an earlier run or section is served from the footage cache
+            filepath = self.stock_footage.cached_video(video)
+            if filepath is None and video['download_url']:
+                # Searches run freely; only the bandwidth-heavy downloads are capped
+                async with self._download_slots():
+                    filepath = await self.stock_footage.get_video(video)
             
-            if result['videos']:
-                video = result['videos'][0]  # Get the first matching video
-                
-                # Download the video
-                filename = f"{section_name}_{video['id']}.mp4"
-                filepath = os.path.join(self.footage_dir, filename)
-                
-                if video['download_url']:
-                    await self.stock_footage.download_video(video['download_url'], filepath)
-                    
-                    # Add to our clips list with duration
-                    video_clips.append({
-                        'path': filepath,
-                        'duration': video['duration']
-                    })
+            if filepath:
+                clip = {
+                    'path': filepath,
+                    'duration': video['duration']
+                }
+                self.remember_clip(section_name, clip)
+                return clip
+        return None
+
+    async def find_relevant_footage(self, script: Dict, prefetched: Optional[Dict[str, asyncio.Task]] = None,
+                                    deadline: float = FOOTAGE_DEADLINE) -> List[Dict]:
+        """Find relevant stock footage based on script content.
+        
+        All sections are searched and downloaded concurrently; sections with
+        a search already started in `prefetched` reuse it. A section that
+        fails or isn't done within `deadline` seconds falls back to a cached
+        clip. Clips are returned in section order, pinned in the footage cache
+        until passed to release_footage().
+        """
+        prefetched = prefetched or {}
+        sections = list(script['script_sections'].items())
+        tasks = {
+            section_name: prefetched.get(section_name)
+            or asyncio.ensure_future(self.find_section_footage(section_name, content))
+            for section_name, content in sections
+        }
+        if not tasks:
+            return []
+        
+        done, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+        for task in pending:
+            task.cancel()
+        
+        video_clips = []
+        for section_name, _ in sections:
+            task = tasks[section_name]
+            clip = None
+            if task not in done:
+                print(f"Footage for {section_name} missed the {deadline}s deadline")
+            elif task.cancelled():
+                print(f"Footage search for {section_name} was cancelled")
+            elif task.exception():
+                print(f"Error finding footage for {section_name}: {str(task.exception())}")
+            else:
+                clip = task.result()
+            
+            if clip is None:
+                clip = self.cached_clip(section_name)
+                if clip:
+                    print(f"Using cached clip for {section_name}: {clip['path']}")
+            if clip:
+                self.stock_footage.cache.pin(clip['path'])
+                video_clips.append(clip)
         
         return video_clips
 
+    def release_footage(self, video_clips: List[Dict]):
+        """Let the footage cache evict clips from find_relevant_footage again."""
+        for clip in video_clips:
+            self.stock_footage.cache.unpin(clip['path'])
+
     def _extract_keywords(self, content: str) -> List[str]:
         """Extract relevant keywords from script content."""
         # Remove common words and punctuation
@@ -95,11 +199,29 @@ class VideoPipeline:
     async def create_video(self, article: Dict) -> str:
         """Create a complete video from an article."""
         try:
-            # Generate script
-            script = await self.script_generator.generate_script(article)
+            # Start each section's footage search as soon as the script gives us
+            # something to search for, rather than after the whole script is done
+            prefetched = {}
+            
+            async def on_segment(segment: Dict):
+                section = segment['section']
+                if section in prefetched or segment['type'] not in ('section', 'visual'):
+                    return
+                # The main content's first visual cue is a better query than the section text
+                prefetched[section] = asyncio.ensure_future(
+                    self.find_section_footage(section, segment['text'])
+                )
+            
+            try:
+                # Generate script
+                script = await self.script_generator.generate_script(article, on_segment=on_segment)
+            except Exception:
+                for task in prefetched.values():
+                    task.cancel()
+                raise
             
             # Find and download relevant footage
-            video_clips = await self.find_relevant_footage(script)
+            video_clips = await self.find_relevant_footage(script, prefetched)
             
             if not video_clips:
                 raise Exception("No suitable video clips found")
@@ -108,11 +230,14 @@ class VideoPipeline:
             filename = f"newsreel_{article.get('id', 'unknown')}_{int(asyncio.get_event_loop().time())}.mp4"
             
             # Create the final video
-            output_path = self.video_editor.create_newsreel(
-                script,
-                video_clips,
-                filename
-            )
+            try:
+                output_path = self.video_editor.create_newsreel(
+                    script,
+                    video_clips,
+                    filename
+                )
+            finally:
+                self.release_footage(video_clips)
             
             return output_path
             
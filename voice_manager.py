@@ -1,13 +1,16 @@
 import os
+import json
 import asyncio
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from use_mcp_tool import use_mcp_tool
+from download_engine import shared_download_engine
 
 class VoiceManager:
     def __init__(self):
         # Create output directory for audio files
         self.output_dir = os.path.expanduser("~/weird_news_pipeline/audio")
         os.makedirs(self.output_dir, exist_ok=True)
+        self.downloader = shared_download_engine()
 
     async def generate_narration(self, text: str, style: str = "newsreel_announcer") -> Optional[str]:
         """Generate narration using Make.com's vintage audio generation."""
@@ -29,18 +32,9 @@ class VoiceManager:
                 audio_url = response_data["audio_url"]
 
                 # Download the audio file
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(audio_url) as response:
-                        if response.status == 200:
-                            # Generate unique filename
-                            filename = f"narration_{int(asyncio.get_event_loop().time())}.mp3"
-                            filepath = os.path.join(self.output_dir, filename)
-                            
-                            # Save the audio file
-                            with open(filepath, "wb") as f:
-                                f.write(await response.read())
-                            
-                            return filepath
+                filename = f"narration_{int(asyncio.get_event_loop().time())}.mp3"
+                filepath = os.path.join(self.output_dir, filename)
+                return await self.downloader.download(audio_url, filepath)
 
             print(f"Error generating narration: {result.get('content', [{'text': 'Unknown error'}])[0]['text']}")
             return None
@@ -73,18 +67,9 @@ class VoiceManager:
                 mixed_audio_url = response_data["mixed_audio_url"]
 
                 # Download the mixed audio file
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(mixed_audio_url) as response:
-                        if response.status == 200:
-                            # Generate unique filename
-                            filename = f"mixed_{int(asyncio.get_event_loop().time())}.mp3"
-                            filepath = os.path.join(self.output_dir, filename)
-                            
-                            # Save the audio file
-                            with open(filepath, "wb") as f:
-                                f.write(await response.read())
-                            
-                            return filepath
+                filename = f"mixed_{int(asyncio.get_event_loop().time())}.mp3"
+                filepath = os.path.join(self.output_dir, filename)
+                return await self.downloader.download(mixed_audio_url, filepath)
 
             print(f"Error adding background music: {result.get('content', [{'text': 'Unknown error'}])[0]['text']}")
             return None
@@ -115,18 +100,9 @@ class VoiceManager:
                 mixed_audio_url = response_data["mixed_audio_url"]
 
                 # Download the mixed audio file
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(mixed_audio_url) as response:
-                        if response.status == 200:
-                            # Generate unique filename
-                            filename = f"effects_{int(asyncio.get_event_loop().time())}.mp3"
-                            filepath = os.path.join(self.output_dir, filename)
-                            
-                            # Save the audio file
-                            with open(filepath, "wb") as f:
-                                f.write(await response.read())
-                            
-                            return filepath
+                filename = f"effects_{int(asyncio.get_event_loop().time())}.mp3"
+                filepath = os.path.join(self.output_dir, filename)
+                return await self.downloader.download(mixed_audio_url, filepath)
 
             print(f"Error adding sound effects: {result.get('content', [{'text': 'Unknown error'}])[0]['text']}")
             return None